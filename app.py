@@ -1,10 +1,18 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
+import hashlib
 import os
 
+from union.executiva import METRICAS_CARTOES, TITULOS, graficos, kpi_cards, kpi_deltas
+from union.facts import split_year
+from union.figures import FigureCache, treemap_figure
+from union.hierarchy import level_rows, subtree
+from union.ingest import BASE_TYPES
+from union.instrument import begin, end, stage, traced
+from union.shared import get_store
+from union.tables import TAMANHO_PAGINA, page, restrict, search_mask, sort_order
+
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
     layout="wide", 
@@ -177,132 +185,34 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# --- FUNÇÕES DE LIMPEZA ROBUSTAS (CORREÇÃO DE CLIENTES) ---
-def clean_currency_br(x):
-    """Para valores monetários (float)"""
-    if pd.isna(x) or str(x).strip() == "": return 0.0
-    # Converte para string para garantir limpeza de pontos
-    s = str(x).strip().replace('"', '').replace("'", "").replace('R$', '').replace(' ', '')
-    s = s.replace('.', '').replace(',', '.')
-    try: return float(s)
-    except: return 0.0
-
-def clean_percentage_br(x):
-    """Para porcentagens"""
-    if pd.isna(x) or str(x).strip() == "": return 0.0
-    s = str(x).strip().replace('"', '').replace('%', '').replace(',', '.')
-    try: return float(s)
-    except: return 0.0
-
-def clean_int_br(x):
-    """
-    CORREÇÃO CRÍTICA: Força interpretação de ponto como milhar.
-    Ex: 13.514 -> vira 13514 (e não 13 ou 13.5)
-    """
-    if pd.isna(x) or str(x).strip() == "": return 0
-    
-    # Converte tudo para string primeiro para evitar que o Pandas interprete 1.000 como 1.0
-    s = str(x).strip()
-    
-    # Remove aspas e espaços
-    s = s.replace('"', '').replace("'", "").replace(' ', '')
-    
-    # Se tiver vírgula (ex: 1.234,00), remove o decimal primeiro
-    if ',' in s:
-        s = s.split(',')[0]
-    
-    # Agora remove o ponto de milhar
-    s = s.replace('.', '')
-    
-    try:
-        # Converte para float primeiro (pra garantir) depois para int
-        return int(float(s))
-    except:
-        return 0
-
 # --- CARREGAMENTO DE DADOS ---
-@st.cache_data
-def load_data():
-    datasets = {}
-    
-    # 1. BASE GERAL
-    try:
-        files = [f for f in os.listdir('.') if f.endswith('.csv') or f.endswith('.CSV')]
-        base_file = next((f for f in files if 'base' in f.lower() or 'dados' in f.lower()), None)
-        
-        if base_file:
-            # Lê tudo como string (dtype=str) para evitar que o Pandas converta "1.000" em 1.0 automaticamente
-            try:
-                df_base = pd.read_csv(base_file, encoding='utf-8', on_bad_lines='skip', dtype=str)
-            except:
-                df_base = pd.read_csv(base_file, encoding='latin1', on_bad_lines='skip', dtype=str)
-                
-            df_base.columns = df_base.columns.str.strip()
-            
-            col_map = {
-                'Venda 2022 R$': 'Venda', 'Meta Venda 2022': 'Meta',
-                'Margem Bruta 2022 %': 'Margem_Perc', 'Qtd de cupom 2022': 'Clientes',
-                'NOME LOJA': 'Loja', 'MÊS': 'Mes'
-            }
-            cols_found = {}
-            for k, v in col_map.items():
-                match = next((c for c in df_base.columns if k.lower() in c.lower()), None)
-                if match: cols_found[match] = v
-            
-            df_base = df_base.rename(columns=cols_found)
-            
-            # Aplica limpezas específicas
-            if 'Venda' in df_base.columns: df_base['Venda'] = df_base['Venda'].apply(clean_currency_br)
-            if 'Meta' in df_base.columns: df_base['Meta'] = df_base['Meta'].apply(clean_currency_br)
-            if 'Clientes' in df_base.columns: df_base['Clientes'] = df_base['Clientes'].apply(clean_int_br)
-            if 'Margem_Perc' in df_base.columns: df_base['Margem_Perc'] = df_base['Margem_Perc'].apply(clean_percentage_br)
-                
-            datasets['base'] = df_base
-    except Exception as e:
-        st.error(f"Erro base principal: {e}")
-
-    # 2. CLASSIFICAÇÃO MERCADOLÓGICA
-    try:
-        class_file = next((f for f in files if 'classificacao' in f.lower()), None)
-        if class_file:
-            try:
-                df_test = pd.read_csv(class_file, encoding='utf-8', on_bad_lines='skip', nrows=5)
-                if 'Classificação' in df_test.columns or 'Código' in df_test.columns:
-                    df_class = pd.read_csv(class_file, encoding='utf-8', on_bad_lines='skip')
-                else:
-                    df_class = pd.read_csv(class_file, encoding='utf-8', on_bad_lines='skip', skiprows=1)
-            except:
-                df_class = pd.read_csv(class_file, encoding='latin1', on_bad_lines='skip', skiprows=1)
-
-            df_class.columns = df_class.columns.str.strip()
-            
-            class_map = {
-                'Classificação': 'Hierarquia', 'Grupo': 'Descricao', 
-                'Valor': 'Venda', '% Partic': 'Part', '% Lucro': 'Lucro'
-            }
-            cols_found = {}
-            for k, v in class_map.items():
-                match = next((c for c in df_class.columns if k.lower() in c.lower()), None)
-                if match: cols_found[match] = v
-            
-            df_class = df_class.rename(columns=cols_found)
-            
-            if 'Venda' in df_class.columns:
-                df_class['Venda'] = df_class['Venda'].apply(clean_currency_br)
-            if 'Hierarquia' in df_class.columns:
-                df_class = df_class.dropna(subset=['Hierarquia'])
-                df_class['Hierarquia'] = df_class['Hierarquia'].astype(str)
-                df_class['Nivel'] = df_class['Hierarquia'].apply(lambda x: x.count('.') + 1 if '.' in x else 1)
-                
-            datasets['mix'] = df_class
-    except Exception as e:
-        pass
-
-    return datasets
-
-data = load_data()
+# Leitura, limpeza e cache em disco ficam em union/ingest.py. Os datasets são
+# carregados uma vez por processo, numa thread que começa com o servidor
+# (`python -m union.serve`) e recarrega sozinha quando um CSV muda; todas as
+# sessões dividem os mesmos buffers, só leitura, cada uma com a sua cópia rasa
+# dos DataFrames (ver union/shared.py).
+# Bases grandes são lidas em blocos (UNION_STREAM_MB / UNION_CHUNK_ROWS) e
+# UNION_BASE_DIR junta vários CSVs (um por loja/mês) lidos em paralelo.
+# Tempos de cada etapa desta execução (ver union/instrument.py)
+trace = begin('rerun')
+store = get_store('.')
+if store.current is None:
+    with stage('espera da carga'):
+        barra = st.progress(0.0, text="Carregando dados...")
+        while store.wait(0.25) is None:
+            lidos, total = store.progresso
+            barra.progress(min(lidos / total, 1.0) if total else 0.0,
+                           text=f"Lendo base... {lidos / 2**20:,.0f} de {total / 2**20:,.0f} MB")
+        barra.empty()
+# Uma versão por execução do script, mesmo que outra seja trocada no meio
+assinatura, data = store.view()
 df = data.get('base', pd.DataFrame())
 df_mix = data.get('mix', pd.DataFrame())
+arvore = data.get('arvore')
+
+if 'base' in data.get('erros', {}):
+    st.error(f"Erro base principal: {data['erros']['base']}")
+    st.stop()
 
 if df.empty:
     st.warning("⚠️ Arquivo 'base.csv' não encontrado ou vazio. Faça upload no GitHub.")
@@ -315,26 +225,51 @@ st.sidebar.markdown("---")
 sel_mes = 'Todos'
 sel_loja = 'Todas'
 
-if 'Mes' in df.columns:
-    meses_unicos = df['Mes'].unique()
-    ordem_meses = ['JAN', 'FEV', 'MAR', 'ABR', 'MAI', 'JUN', 'JUL', 'AGO', 'SET', 'OUT', 'NOV', 'DEZ']
-    # Tratamento para garantir que meses sejam strings antes de ordenar
-    meses_validos = [str(m) for m in meses_unicos if isinstance(m, str) or pd.notna(m)]
-    meses_sorted = sorted(meses_validos, 
-                          key=lambda x: ordem_meses.index(x.upper()) if x.upper() in ordem_meses else 99)
-    sel_mes = st.sidebar.selectbox("Período (Mês)", ['Todos'] + meses_sorted)
+# Valores dos seletores já vêm ordenados do carregamento (ver union/filters.py)
+opcoes = data.get('opcoes', {})
+
+if 'Mes' in opcoes:
+    sel_mes = st.sidebar.selectbox("Período (Mês)", ['Todos', *opcoes['Mes']])
+
+if 'Loja' in opcoes:
+    sel_loja = st.sidebar.selectbox("Unidade de Negócio", ['Todas', *opcoes['Loja']])
+
+# Só colunas que chegam à tela: as de COL_MAP, os anos anteriores que os cartões
+# comparam e, do mix, Venda e Part (extras e % Lucro não aparecem em lugar nenhum)
+def na_tela(dataset, coluna):
+    if dataset == 'mix':
+        return coluna in ('Venda', 'Part')
+    metrica = split_year(coluna)
+    return coluna in BASE_TYPES or (metrica is not None and metrica[0] in METRICAS_CARTOES)
+
+falhas = {f"{k}/{c}": n for k, cols in data.get('falhas', {}).items() for c, n in cols.items()
+          if na_tela(k, c)}
+if falhas:
+    st.sidebar.warning("⚠️ Células não convertidas (contadas como 0): " + ", ".join(f"{c}: {n}" for c, n in falhas.items()))
 
-if 'Loja' in df.columns:
-    lojas = sorted([str(l) for l in df['Loja'].unique() if pd.notna(l)])
-    sel_loja = st.sidebar.selectbox("Unidade de Negócio", ['Todas'] + lojas)
+# Erros dos demais datasets (mix, fatos por ano): o dashboard segue sem eles
+for nome, erro in data.get('erros', {}).items():
+    if nome != 'base':
+        st.sidebar.error(f"Erro ao carregar {nome}: {erro}")
+
+rejeitados = data.get('rejeitados', {})
+if rejeitados:
+    with st.sidebar.expander(f"⚠️ {len(rejeitados)} arquivo(s) da base ignorado(s)"):
+        for arquivo, motivo in rejeitados.items():
+            st.markdown(f"**{arquivo}**: {motivo}")
 
 st.sidebar.markdown("---")
 st.sidebar.info("**Nota Data Sigma:** Pipeline atualizado com validação de milhar BR.")
 
-# Aplica Filtros
-df_filtered = df.copy()
-if sel_mes != 'Todos': df_filtered = df_filtered[df_filtered['Mes'] == sel_mes]
-if sel_loja != 'Todas': df_filtered = df_filtered[df_filtered['Loja'] == sel_loja]
+# Painel de tempos: UNION_DEBUG=1 no servidor ou ?debug=1 na URL
+DEBUG = bool(os.environ.get('UNION_DEBUG') or st.query_params.get('debug'))
+painel_debug = st.sidebar.empty() if DEBUG else None
+
+# Filtros e agregações ficam no backend de consultas (cubo em pandas ou DuckDB,
+# ver union/query.py); as abas só pedem totais e somas por dimensão
+consultas = data['consultas']
+# Métricas do dashboard por ano, largas por Mês × Loja (comparações com o ano anterior)
+fatos_cubo, fatos_idx = data.get('fatos_cubo'), data.get('fatos_idx')
 
 # --- CABEÇALHO ---
 st.markdown(f"""
@@ -345,198 +280,183 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-# --- CORES ---
-COLOR_BLUE = "#0047AB"
-COLOR_GREEN = "#00A859"
-COLOR_ALERT = "#EF4444"
-COLOR_TEXT = "#1F2937"
-COLOR_GRADIENT = ["#0047AB", "#006494", "#00817D", "#009C65", "#00A859"]
-
-def update_fig_layout(fig):
-    fig.update_layout(
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        font={'color': COLOR_TEXT, 'family': 'Roboto'},
-        margin=dict(l=10, r=10, t=30, b=10),
-        xaxis=dict(showgrid=False, zeroline=False),
-        yaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.05)', zeroline=False),
-    )
-    return fig
-
-tab1, tab2, tab3 = st.tabs(["📊 Visão Executiva", "📦 Análise de Mix", "📋 Detalhes Operacionais"])
+# --- FIGURAS ---
+# Cache de figuras compartilhado pelo servidor: chave = (gráfico, filtros que ele
+# usa, versão dos dados). Gráficos cujas entradas não mudaram não são refeitos.
+@st.cache_resource
+def figure_cache():
+    return FigureCache()
+
+figuras = figure_cache()
+versao_dados = hashlib.blake2b(repr(assinatura).encode(), digest_size=8).hexdigest()
+
+# --- TABELAS PAGINADAS ---
+# Ordenação, busca e paginação no servidor: só a página visível vai para o navegador.
+@st.cache_data(max_entries=64)
+def ordem_tabela(tabela, versao, coluna, crescente, _df):
+    # `_df` não entra no hash (seria caro); `tabela` + `versao` identificam os dados
+    return sort_order(_df[coluna], crescente)
+
+def tabela_paginada(df, key, versao, ordem_padrao, crescente=False, busca=(), linhas=None,
+                    estilo=None, **kwargs):
+    c1, c2, c3, c4 = st.columns([3, 2, 1, 1])
+    termo = c1.text_input("Buscar", key=f"{key}_busca", placeholder=" / ".join(busca)) if busca else ""
+    coluna = c2.selectbox("Ordenar por", list(df.columns), index=list(df.columns).index(ordem_padrao),
+                          key=f"{key}_coluna")
+    crescente = c3.selectbox("Ordem", [False, True], index=int(crescente), key=f"{key}_crescente",
+                             format_func=lambda c: "Crescente" if c else "Decrescente")
+
+    ordem = restrict(ordem_tabela(key, versao, coluna, crescente, df), linhas)
+    if termo:
+        ordem = ordem[search_mask(df, busca, termo)[ordem]]
+
+    n_paginas = max(1, -(-len(ordem) // TAMANHO_PAGINA))
+    if st.session_state.get(f"{key}_pagina", 1) > n_paginas:
+        st.session_state[f"{key}_pagina"] = n_paginas
+    pagina = c4.number_input("Página", min_value=1, max_value=n_paginas, value=1, key=f"{key}_pagina")
+    pos, n_paginas = page(ordem, pagina)
+
+    view = df.iloc[pos]
+    st.dataframe(estilo(view) if estilo else view, **kwargs)
+    st.caption(f"{len(ordem):,} linhas • página {pagina} de {n_paginas}".replace(",", "."))
+
+def grafico(nome, key, build):
+    # Figura (do cache ou construída) e envio ao navegador, medidos em separado
+    with stage(f"{nome}: figura"):
+        fig = figuras.get(key, build)
+    with stage(f"{nome}: envio"):
+        st.plotly_chart(fig, use_container_width=True)
+
+# --- ABAS ---
+# Cada aba é um fragmento: um widget dentro dela (slider, página da tabela...)
+# reroda só a própria aba. E só a aba aberta roda (`on_change="rerun"` + `.open`).
 
 # --- TAB 1: EXECUTIVA ---
-with tab1:
+@st.fragment
+@traced('aba 1: executiva')
+def aba_executiva(sel_mes, sel_loja):
     # 1. KPIs
-    venda = df_filtered['Venda'].sum() if 'Venda' in df_filtered.columns else 0
-    meta = df_filtered['Meta'].sum() if 'Meta' in df_filtered.columns else 0
-    clientes = df_filtered['Clientes'].sum() if 'Clientes' in df_filtered.columns else 0
-    
-    # Cálculo seguro do ticket
-    ticket = venda / clientes if clientes > 0 else 0
-        
-    if 'Margem_Perc' in df_filtered.columns:
-        margem = df_filtered['Margem_Perc'].mean()
-    else: margem = 0
+    with stage('kpis'):
+        kpis = consultas.totals(sel_mes, sel_loja)
+    with stage('kpis: variação anual'):
+        deltas = kpi_deltas(fatos_cubo, sel_mes, sel_loja, indice=fatos_idx)
 
     c1, c2, c3, c4 = st.columns(4)
-    
-    with c1: st.metric("Venda Total", f"R$ {venda:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-    with c2: st.metric("Margem", f"{margem:.1f}%")
-    with c3: st.metric("Ticket Médio", f"R$ {ticket:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-    with c4: st.metric("Clientes Atendidos", f"{clientes:,.0f}".replace(",", "."))
+    for col, (rotulo, valor, delta) in zip((c1, c2, c3, c4), kpi_cards(kpis, deltas)):
+        with col: st.metric(rotulo, valor, delta)
     
     st.markdown("###")
 
+    builds = graficos(consultas, kpis, df_mix, arvore, sel_mes, sel_loja)
+
+    def mostrar(nome):
+        st.markdown(f"##### {TITULOS[nome]}")
+        if nome in builds:
+            filtros, build = builds[nome]
+            grafico(nome, (nome, versao_dados, *filtros), build)
+        elif nome == 'donut':
+            st.info("Aguardando arquivo de Classificação Mercadológica.")
+
     # 2. LINHA 1 DE GRÁFICOS
     col_g1, col_g2 = st.columns([2, 1])
-    
-    with col_g1:
-        st.markdown("##### 📈 Evolução vs Metas")
-        if 'Mes' in df_filtered.columns:
-            idx_col = 'Mes' if sel_mes == 'Todos' else 'Loja'
-            df_chart = df_filtered.groupby(idx_col)[['Venda', 'Meta']].sum().reset_index()
-            
-            if idx_col == 'Mes':
-                df_chart['sort'] = df_chart['Mes'].apply(lambda x: ordem_meses.index(x.upper()) if x.upper() in ordem_meses else 99)
-                df_chart = df_chart.sort_values('sort')
-            else:
-                df_chart = df_chart.sort_values('Venda', ascending=False)
-
-            fig = go.Figure()
-            
-            # Adicionando Rótulos de Dados (R$ 1.2M)
-            fig.add_trace(go.Bar(
-                x=df_chart[idx_col], y=df_chart['Venda'], 
-                name='Realizado', 
-                marker_color=COLOR_BLUE,
-                opacity=0.9,
-                text=df_chart['Venda'].apply(lambda x: f"R$ {x/1e6:.1f}M" if x > 1e6 else f"R$ {x/1e3:.0f}k"),
-                textposition='auto'
-            ))
-            
-            fig.add_trace(go.Scatter(
-                x=df_chart[idx_col], y=df_chart['Meta'], 
-                name='Meta', 
-                mode='lines+markers', 
-                line=dict(color=COLOR_GREEN, width=3),
-                marker=dict(size=6, color='white', line=dict(width=2, color=COLOR_GREEN))
-            ))
-            
-            fig = update_fig_layout(fig)
-            fig.update_layout(height=320, legend=dict(orientation="h", y=1.1, x=1, xanchor='right'), margin=dict(t=40))
-            st.plotly_chart(fig, use_container_width=True)
-            
-    with col_g2:
-        st.markdown("##### 🎯 Atingimento Global")
-        perc = (venda / meta * 100) if meta > 0 else 0
-        perc_visual = min(perc, 999)
-        gauge_color = COLOR_GREEN if perc >= 100 else (COLOR_BLUE if perc >= 80 else COLOR_ALERT)
-
-        fig_gauge = go.Figure(go.Indicator(
-            mode="gauge+number", value=perc_visual,
-            number={'suffix': "%", 'font': {'size': 36, 'family': 'Roboto', 'color': COLOR_TEXT}},
-            gauge={
-                'axis': {'range': [0, 120]}, 
-                'bar': {'color': gauge_color}, 
-                'steps': [{'range': [0, 100], 'color': "rgba(200, 200, 200, 0.2)"}], 
-                'threshold': {'line': {'color': COLOR_GREEN, 'width': 4}, 'thickness': 0.75, 'value': 100}
-            }
-        ))
-        fig_gauge = update_fig_layout(fig_gauge)
-        fig_gauge.update_layout(height=320, margin=dict(t=40,b=20))
-        st.plotly_chart(fig_gauge, use_container_width=True)
+    with col_g1: mostrar('evolucao')
+    with col_g2: mostrar('gauge')
 
     # 3. LINHA 2 DE GRÁFICOS
     col_g3, col_g4 = st.columns(2)
-    
-    with col_g3:
-        st.markdown("##### 🍰 Distribuição por Departamento (Top 5)")
-        if not df_mix.empty and 'Descricao' in df_mix.columns:
-            if 'Nivel' in df_mix.columns:
-                df_depto = df_mix[df_mix['Nivel'] == 1].copy()
-                if df_depto.empty: df_depto = df_mix.copy()
-            else:
-                df_depto = df_mix.copy()
-            
-            df_depto = df_depto.sort_values('Venda', ascending=False).head(5)
-            
-            fig_donut = px.pie(
-                df_depto, values='Venda', names='Descricao', hole=0.6, 
-                color_discrete_sequence=COLOR_GRADIENT
-            )
-            fig_donut = update_fig_layout(fig_donut)
-            fig_donut.update_layout(height=320, margin=dict(t=0,b=0,l=0,r=0), showlegend=True)
-            fig_donut.update_traces(textinfo='percent+label', textposition='inside')
-            st.plotly_chart(fig_donut, use_container_width=True)
-        else:
-            st.info("Aguardando arquivo de Classificação Mercadológica.")
-            
-    with col_g4:
-        st.markdown("##### 🏆 Ranking de Lojas")
-        if 'Loja' in df_filtered.columns:
-            df_rank = df_filtered.groupby('Loja')['Venda'].sum().sort_values(ascending=True).reset_index()
-            fig_bar = px.bar(
-                df_rank, x='Venda', y='Loja', orientation='h', 
-                text_auto='.2s', color_discrete_sequence=[COLOR_BLUE]
-            )
-            fig_bar = update_fig_layout(fig_bar)
-            fig_bar.update_layout(height=320, xaxis=dict(showgrid=False))
-            st.plotly_chart(fig_bar, use_container_width=True)
+    with col_g3: mostrar('donut')
+    with col_g4: mostrar('ranking')
 
 # --- TAB 2: MIX ---
-with tab2:
-    if df_mix.empty:
+@st.fragment
+@traced('aba 2: mix')
+def aba_mix():
+    if df_mix.empty or arvore is None:
         st.warning("⚠️ Arquivo de Classificação Mercadológica não encontrado.")
     else:
         st.markdown("##### 🌳 Árvore de Produtos (Bill of Materials)")
         st.caption("Visão hierárquica do portfólio de produtos.")
         
-        nivel_selecionado = st.slider("Nível de Detalhe:", 1, 4, 2)
+        col_s1, col_s2 = st.columns([1, 2])
+        with col_s1:
+            # Drill-down: None = portfólio inteiro; senão, posição do departamento na árvore
+            raiz = st.selectbox(
+                "Departamento:", [None] + level_rows(arvore, 1).tolist(),
+                format_func=lambda i: "Todos" if i is None else str(df_mix['Descricao'].iloc[i]).strip()
+            )
+        with col_s2:
+            nivel_selecionado = st.slider("Nível de Detalhe:", 1, 4, 2)
         
-        df_tree = df_mix[(df_mix['Nivel'] == nivel_selecionado) & (df_mix['Venda'] > 0)].copy()
-        if df_tree.empty:
-            df_tree = df_mix[df_mix['Venda'] > 0].nlargest(100, 'Venda')
-            
-        fig_tree = px.treemap(
-            df_tree,
-            path=['Descricao'],
-            values='Venda',
-            color='Venda',
-            color_continuous_scale='Blues',
-            hover_data=['Hierarquia', 'Part']
-        )
-        fig_tree.update_traces(textinfo="label+value+percent entry")
-        fig_tree = update_fig_layout(fig_tree)
-        fig_tree.update_layout(height=600, margin=dict(t=0, l=0, r=0, b=0))
-        st.plotly_chart(fig_tree, use_container_width=True)
+        grafico('treemap', ('treemap', versao_dados, raiz, nivel_selecionado),
+                lambda: treemap_figure(df_mix, arvore, nivel_selecionado, raiz))
         
         st.markdown("### Tabela Analítica")
-        st.dataframe(df_mix[['Hierarquia', 'Descricao', 'Venda', 'Part']].sort_values('Venda', ascending=False), use_container_width=True)
+        with stage('tabela analítica'):
+            tabela_paginada(
+                df_mix[['Hierarquia', 'Descricao', 'Venda', 'Part']], 'mix', versao_dados, 'Venda',
+                busca=('Hierarquia', 'Descricao'), linhas=None if raiz is None else subtree(arvore, raiz),
+                use_container_width=True,
+                column_config={"Part": st.column_config.NumberColumn("Part %", format="%.2f%%")}
+            )
+
+        # Nós cuja soma dos filhos não bate com o valor do próprio nó
+        divergentes = arvore['divergentes']
+        if len(divergentes):
+            with st.expander(f"⚠️ {len(divergentes)} nós com soma dos filhos diferente do total"):
+                df_div = df_mix.iloc[divergentes][['Hierarquia', 'Descricao', 'Venda']].copy()
+                df_div['Soma dos Filhos'] = arvore['soma_filhos'][divergentes]
+                df_div['Diferença'] = df_div['Venda'] - df_div['Soma dos Filhos']
+                st.dataframe(df_div, use_container_width=True, hide_index=True)
 
 # --- TAB 3: DETALHES ---
-with tab3:
+@st.fragment
+@traced('aba 3: detalhes')
+def aba_detalhes(sel_mes, sel_loja):
     st.markdown("##### 📋 Detalhamento Operacional")
-    if 'Loja' in df_filtered.columns:
-        df_table = df_filtered.groupby('Loja')[['Venda', 'Meta', 'Clientes']].sum().reset_index()
+    if 'Loja' in consultas.dims:
+        with stage('lojas: consulta') as info:
+            df_table = consultas.rollup('Loja', ['Venda', 'Meta', 'Clientes'], sel_mes, sel_loja)
+            info['linhas'] = len(df_table)
         df_table['Atingimento'] = (df_table['Venda'] / df_table['Meta'])
         df_table['Atingimento'] = df_table['Atingimento'].replace([np.inf, -np.inf], 0).fillna(0)
         
-        st.dataframe(
-            df_table.style.format({
-                'Venda': 'R$ {:,.2f}', 
-                'Meta': 'R$ {:,.2f}', 
-                'Clientes': '{:,.0f}', 
-                'Atingimento': '{:.1%}'
-            }),
-            use_container_width=True,
-            column_config={
-                "Atingimento": st.column_config.ProgressColumn(
-                    "Meta %", 
-                    format="%.1f%%", 
-                    min_value=0, max_value=1.5
-                ),
-                "Venda": st.column_config.NumberColumn("Venda Real", format="R$ %.2f")
-            },
-            hide_index=True
-        )
+        with stage('lojas: tabela'):
+            tabela_paginada(
+                df_table, 'operacional', (versao_dados, sel_mes, sel_loja), 'Loja', crescente=True,
+                busca=('Loja',),
+                estilo=lambda v: v.style.format({
+                    'Venda': 'R$ {:,.2f}', 
+                    'Meta': 'R$ {:,.2f}', 
+                    'Clientes': '{:,.0f}', 
+                    'Atingimento': '{:.1%}'
+                }),
+                use_container_width=True,
+                column_config={
+                    "Atingimento": st.column_config.ProgressColumn(
+                        "Meta %", 
+                        format="%.1f%%", 
+                        min_value=0, max_value=1.5
+                    ),
+                    "Venda": st.column_config.NumberColumn("Venda Real", format="R$ %.2f")
+                },
+                hide_index=True
+            )
+
+tab1, tab2, tab3 = st.tabs(["📊 Visão Executiva", "📦 Análise de Mix", "📋 Detalhes Operacionais"],
+                           key="aba", on_change="rerun")
+with tab1:
+    if tab1.open: aba_executiva(sel_mes, sel_loja)
+with tab2:
+    if tab2.open: aba_mix()
+with tab3:
+    if tab3.open: aba_detalhes(sel_mes, sel_loja)
+
+end(trace)
+if painel_debug is not None:
+    with painel_debug.container():
+        st.markdown("### ⏱️ Tempos (debug)")
+        st.caption(f"Esta execução: {trace.segundos:.3f} s")
+        st.dataframe(pd.DataFrame(trace.etapas), hide_index=True)
+        if store.trace is not None:
+            st.caption(f"Última carga dos dados: {store.trace.segundos:.3f} s")
+            st.dataframe(pd.DataFrame(store.trace.etapas), hide_index=True)
@@ -0,0 +1,12 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def cache_temporario(tmp_path, monkeypatch):
+    # Cada teste com o próprio cache em disco
+    monkeypatch.setenv('UNION_CACHE_DIR', str(tmp_path / 'cache'))
@@ -0,0 +1,114 @@
+import csv
+import os
+
+import pandas as pd
+import pytest
+
+from union.cache import cached_frame, cached_growing_frame
+from union.ingest import _load_base, read_base
+from union.synth import BASE_HEADER, gerar_base, write_base
+
+
+def _linhas(path, offset=0):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return pd.DataFrame({'linha': [l.decode() for l in f.read().split(b'\n') if l]})
+
+
+class Leitor:
+    """build/extend de `cached_growing_frame` que registram as chamadas."""
+
+    def __init__(self, path):
+        self.path, self.chamadas = path, []
+
+    def build(self):
+        self.chamadas.append('build')
+        return _linhas(self.path), {}
+
+    def extend(self, df, meta, offset):
+        self.chamadas.append(('extend', offset))
+        return pd.concat([df, _linhas(self.path, offset)], ignore_index=True), meta
+
+    def load(self):
+        df, _ = cached_growing_frame('t', self.path, self.build, self.extend,
+                                     pasta=os.path.dirname(self.path))
+        return df['linha'].tolist()
+
+
+def _escreve(path, texto, modo='w'):
+    with open(path, modo, encoding='utf-8', newline='') as f:
+        f.write(texto)
+
+
+@pytest.fixture
+def leitor(tmp_path):
+    path = str(tmp_path / 'dados.csv')
+    _escreve(path, 'a\nb\n')
+    return Leitor(path)
+
+
+def test_sem_mudanca_usa_o_cache(leitor):
+    assert leitor.load() == ['a', 'b']
+    assert leitor.load() == ['a', 'b']
+    # Só o mtime mudou: o conteúdo é o mesmo, nada é relido
+    os.utime(leitor.path, ns=(1, 1))
+    assert leitor.load() == ['a', 'b']
+    assert leitor.chamadas == ['build']
+
+
+def test_linhas_novas_no_fim_leem_so_a_cauda(leitor):
+    leitor.load()
+    _escreve(leitor.path, 'c\nd\n', 'a')
+    assert leitor.load() == ['a', 'b', 'c', 'd']
+    assert leitor.chamadas == ['build', ('extend', 4)]
+
+
+def test_linha_parcial_e_relida_na_proxima_cauda(leitor):
+    leitor.load()
+    _escreve(leitor.path, 'c\nd', 'a')         # gravação em andamento
+    assert leitor.load() == ['a', 'b', 'c', 'd']
+    _escreve(leitor.path, 'e\n', 'a')           # a linha termina como 'de'
+    assert leitor.load() == ['a', 'b', 'c', 'de']
+    # A segunda cauda recomeça no início da linha parcial, sem duplicá-la
+    assert leitor.chamadas == ['build', ('extend', 4), ('extend', 6)]
+
+
+def test_mudanca_antes_do_offset_reconstroi(leitor):
+    leitor.load()
+    _escreve(leitor.path, 'x\nb\nc\n')          # primeira linha alterada e mais uma no fim
+    assert leitor.load() == ['x', 'b', 'c']
+    assert leitor.chamadas == ['build', 'build']
+
+
+def test_cached_frame_muda_com_o_conteudo(tmp_path):
+    path = str(tmp_path / 'mix.csv')
+    _escreve(path, 'a\n')
+    chamadas = []
+    build = lambda: (chamadas.append(1) or _linhas(path), {'n': len(chamadas)})
+    assert cached_frame('m', [path], build, pasta=str(tmp_path))[1] == {'n': 1}
+    assert cached_frame('m', [path], build, pasta=str(tmp_path))[1] == {'n': 1}
+    _escreve(path, 'b\n')
+    assert cached_frame('m', [path], build, pasta=str(tmp_path))[1] == {'n': 2}
+
+
+def test_base_do_erp_crescendo(tmp_path):
+    # Ponta a ponta: cauda da base real (com cabeçalho sintético) == leitura completa
+    path = str(tmp_path / 'dados.csv')
+    linhas = gerar_base(lojas=3, meses=12, sujeira=0, seed=2)
+    # Célula suja na parte da linha parcial: a falha não pode contar duas vezes
+    assert BASE_HEADER[9].strip() == 'Venda 2022 R$'
+    linhas[30][9] = 'R$ xx'
+    write_base(path, linhas[:20])
+    _load_base(path, use_cache=True)
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        w = csv.writer(f, lineterminator='\r\n')
+        w.writerows(linhas[20:30])
+        f.write(','.join(f'"{c}"' for c in linhas[30][:10]))      # linha parcial
+    _load_base(path, use_cache=True)
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(',' + ','.join(f'"{c}"' for c in linhas[30][10:]) + '\r\n')
+    df, falhas = _load_base(path, use_cache=True)
+    esperado, falhas_esperadas = read_base(path)
+    assert len(BASE_HEADER) == len(linhas[30])
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), esperado, check_categorical=False)
+    assert falhas == falhas_esperadas == {'Venda': 1}
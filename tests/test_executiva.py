@@ -0,0 +1,41 @@
+import pandas as pd
+
+from union.executiva import kpi_cards, kpi_deltas
+from union.cube import build_cube_index
+from union.facts import build_facts, year_columns, year_cube
+from union.ingest import BASE_YEAR
+
+
+def _fatos(**colunas):
+    base = pd.DataFrame({'Mes': ['JAN', 'JAN', 'FEV'], 'Loja': ['A', 'B', 'A'], **colunas})
+    return year_cube(build_facts(base, year_columns(colunas)))
+
+
+def test_ano_dos_cartoes():
+    assert BASE_YEAR == 2022
+
+
+def test_tres_anos_compara_o_ano_dos_cartoes():
+    fatos = _fatos(**{
+        'Venda 2021 R$': [100.0, 100.0, 50.0], 'Venda 2022 R$': [110.0, 120.0, 70.0],
+        'Venda 2023 R$': [0.0, 0.0, 0.0],
+        'Qtd de cupom 2021': [10, 10, 5], 'Qtd de cupom 2022': [10, 10, 5],
+        'Margem Bruta 2021 %': [20.0, 30.0, 25.0], 'Margem Bruta 2022 %': [22.0, 31.0, 27.0],
+    })
+    deltas = kpi_deltas(fatos)
+    assert deltas == {"Venda Total": "+20.0% vs 2021", "Margem": "+1.7 p.p. vs 2021",
+                      "Ticket Médio": "+20.0% vs 2021", "Clientes Atendidos": "+0.0% vs 2021"}
+    assert kpi_deltas(fatos, loja='B')["Venda Total"] == "+20.0% vs 2021"
+    indice = build_cube_index(fatos)
+    assert kpi_deltas(fatos, 'JAN', 'B', indice=indice)["Venda Total"] == "+20.0% vs 2021"
+    assert kpi_deltas(fatos, 'FEV', indice=indice)["Venda Total"] == "+40.0% vs 2021"
+    # Um ano anterior faltando: compara com o maior ano anterior que existe
+    assert kpi_deltas(fatos, ano=2023)["Venda Total"] == "-100.0% vs 2022"
+
+
+def test_sem_ano_anterior_nao_tem_variacao():
+    fatos = _fatos(**{'Venda 2022 R$': [1.0, 2.0, 3.0], 'Venda 2023 R$': [2.0, 3.0, 4.0]})
+    assert kpi_deltas(fatos) == {}
+    assert kpi_deltas(None) == {}
+    cards = kpi_cards({'venda': 10.0, 'clientes': 2, 'margem': 25.0}, kpi_deltas(fatos))
+    assert [delta for _, _, delta in cards] == [None] * 4
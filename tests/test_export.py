@@ -0,0 +1,41 @@
+import os
+
+from union.export import export, folders, jobs, slug
+from union.synth import generate
+
+
+def test_slug():
+    assert slug('LOJA 01/A') == 'LOJA_01_A'
+    assert slug('///') == '_'
+
+
+def test_pastas_sem_colisao():
+    lojas = ['Todas', 'LOJA 01/A', 'LOJA 01 A', 'loja 01 a', 'LOJA 02']
+    pastas = folders(lojas)
+    assert len({p.lower() for p in pastas.values()}) == len(lojas)
+    # Sem colisão, o nome continua o slug
+    assert pastas['Todas'] == 'Todas' and pastas['LOJA 02'] == 'LOJA_02'
+    assert pastas['LOJA 01/A'].startswith('LOJA_01_A-')
+    # O sufixo não depende de quais outras lojas existem
+    assert folders(['LOJA 01/A', 'LOJA 01 A'])['LOJA 01/A'] == pastas['LOJA 01/A']
+
+
+def test_jobs_com_destinos_unicos(tmp_path):
+    opcoes = {'Mes': ['JAN', 'FEV'], 'Loja': ['LOJA 01/A', 'LOJA 01 A']}
+    lista = jobs(str(tmp_path), opcoes)
+    assert len(lista) == 3 * 3
+    assert len({destino for _, _, destino in lista}) == len(lista)
+
+
+def test_export_com_plotlyjs_em_arquivo(tmp_path):
+    pasta, saida = tmp_path / 'dados', tmp_path / 'saida'
+    generate(str(pasta), lojas=2, meses=2, skus=100)
+    escritos = export(str(pasta), str(saida), workers=1, lojas=['Todas'])
+    js = os.path.join(str(saida), 'plotly.min.js')
+    assert escritos[0] == js and os.path.getsize(js) > 2 ** 20
+    htmls = escritos[1:]
+    assert len(htmls) == 3 and all(p.endswith('.html') for p in htmls)
+    for p in htmls:
+        assert os.path.getsize(p) < 2 ** 20
+        with open(p, encoding='utf-8') as f:
+            assert '../plotly.min.js' in f.read()
@@ -0,0 +1,20 @@
+import json
+
+import pandas as pd
+
+from union.figures import FigureCache, ranking_figure
+
+
+def test_cache_nao_refaz_a_figura():
+    cache = FigureCache()
+    chamadas = []
+
+    def build():
+        chamadas.append(1)
+        return ranking_figure(pd.DataFrame({'Loja': ['A', 'B'], 'Venda': [2.0, 1.0]}))
+
+    primeira = cache.get(('ranking', 1), build)
+    segunda = cache.get(('ranking', 1), build)
+    assert len(chamadas) == 1 and (cache.hits, cache.misses) == (1, 1)
+    assert json.loads(segunda.to_json()) == json.loads(primeira.to_json())
+
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from union.hierarchy import build_tree, children, level_rows, preorder, subtree
+
+
+def _mix():
+    # '1.20' não bate com o filho (30 != 40); '2.10.100.001' não tem pai direto
+    linhas = [
+        ('2.10.100.001', 4, 50.0), ('1.20', 2, 40.0), ('1', 1, 100.0), ('1.10.100', 3, 60.0),
+        ('2', 1, 50.0), ('1.20.100', 3, 30.0), ('1.10', 2, 60.0),
+    ]
+    return pd.DataFrame(linhas, columns=['Hierarquia', 'Nivel', 'Venda'])
+
+
+def test_preordem_pais_antes_dos_filhos():
+    df = preorder(_mix())
+    assert df['Hierarquia'].tolist() == ['1', '1.10', '1.10.100', '1.20', '1.20.100',
+                                         '2', '2.10.100.001']
+
+
+def test_arvore():
+    df = preorder(_mix())
+    arvore = build_tree(df)
+    assert arvore['pai'].tolist() == [-1, 0, 1, 0, 3, -1, 5]
+    assert arvore['fim'].tolist() == [5, 3, 3, 5, 5, 7, 7]
+    # Órfão fica pendurado no ancestral mais próximo que existe
+    assert arvore['pai'][arvore['posicao']['2.10.100.001']] == arvore['posicao']['2']
+    assert arvore['divergentes'].tolist() == [arvore['posicao']['1.20']]
+    np.testing.assert_allclose(arvore['soma_filhos'], [100.0, 60.0, 0.0, 30.0, 0.0, 50.0, 0.0])
+    assert arvore['total_folhas'][0] == 90.0 and arvore['total_folhas'][5] == 50.0
+
+
+def test_subarvore_filhos_e_niveis():
+    arvore = build_tree(preorder(_mix()))
+    assert subtree(arvore, 0) == slice(0, 5)
+    assert subtree(arvore, 2) == slice(2, 3)
+    assert children(arvore, 0).tolist() == [1, 3]
+    assert children(arvore, 5).tolist() == [6]
+    assert children(arvore, 6).tolist() == []
+    assert level_rows(arvore, 3).tolist() == [2, 4]
+    assert level_rows(arvore, 3, raiz=3).tolist() == [4]
+    assert level_rows(arvore, 2, raiz=5).tolist() == []
+    assert level_rows(arvore, 9).tolist() == []
@@ -0,0 +1,126 @@
+import csv
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from union.executiva import kpi_deltas
+from union.ingest import load_datasets, read_mix
+from union.instrument import tracing
+from union.synth import BASE_HEADER, MIX_HEADER, gerar_base, gerar_mix, generate, write_mix
+from union.tables import sort_order
+
+
+def test_mix_percentuais_numericos(tmp_path):
+    path = str(tmp_path / 'classificacao_mercadologica.csv')
+    linhas = gerar_mix(skus=300, seed=3)
+    linhas[7][MIX_HEADER.index('% Lucro')] = '-2.924,13'    # como no arquivo real
+    write_mix(path, linhas, encoding='latin1')
+    df, falhas = read_mix(path)
+    assert falhas == {}
+    for col in ('Venda', 'Part', 'Lucro'):
+        assert df[col].dtype == 'float64'
+    assert df['Lucro'].min() == -2924.13
+    # Ordenar por Part é ordem numérica, não de texto ('7,79' antes de '25,32')
+    part = df['Part'].to_numpy()[sort_order(df['Part'], False)]
+    assert np.all(np.diff(part) <= 0)
+
+
+def _base_com_2023(path, linhas, venda23):
+    # Export com uma coluna a mais no fim: ' Venda 2023 R$', vazia onde ainda não há valor
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f, lineterminator='\r\n')
+        w.writerow(BASE_HEADER + [' Venda 2023 R$'])
+        w.writerows(linha + [v] for linha, v in zip(linhas, venda23))
+
+
+def _cache_da_leitura(pasta, **kwargs):
+    with tracing('carga') as trace:
+        data = load_datasets(pasta, **kwargs)
+    etapa = next(e for e in trace.etapas if e['etapa'] == 'base: leitura')
+    return data, etapa.get('cache')
+
+
+def test_fatos_saem_da_leitura_da_base(tmp_path):
+    linhas = gerar_base(lojas=3, meses=4, sujeira=0, seed=1)
+    venda23 = [' 1.000,50 ' if i % 2 else '' for i in range(len(linhas))]
+    _base_com_2023(str(tmp_path / 'dados.csv'), linhas, venda23)
+    data, cache = _cache_da_leitura(str(tmp_path))
+    assert cache == 'miss' and 'fatos' not in data['erros']
+    fatos = data['fatos']
+
+    # Só as colunas de COL_MAP (e extras) ficam na base em memória
+    assert 'Venda' in data['base'].columns and 'Venda 2023 R$' not in data['base'].columns
+    venda = fatos[fatos['metrica'] == 'Venda'].groupby('ano')[['valor', 'n']].sum()
+    assert venda.loc[2023, 'n'] == len(linhas) // 2
+    assert venda.loc[2023, 'valor'] == pytest.approx(1000.5 * (len(linhas) // 2))
+    assert venda.loc[2022, 'valor'] == pytest.approx(data['base']['Venda'].sum())
+    # Só as métricas que o dashboard usa: CMV, Ruptura... nem são lidas
+    assert set(fatos['metrica'].astype(str)) == {'Venda', 'Meta', 'Clientes', 'Margem_Perc'}
+    # Os cartões comparam 2022 com 2021, mesmo com 2023 na base
+    deltas = kpi_deltas(data['fatos_cubo'], indice=data['fatos_idx'])
+    assert len(deltas) == 4 and all(d.endswith('vs 2021') for d in deltas.values())
+
+    # Uma linha nova no fim: só a cauda é lida, e os fatos acompanham
+    with open(tmp_path / 'dados.csv', 'a', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\r\n').writerow(linhas[0] + [' 2,00 '])
+    data, cache = _cache_da_leitura(str(tmp_path))
+    assert cache == 'cauda'
+    esperado = load_datasets(str(tmp_path), use_cache=False)['fatos']
+    pd.testing.assert_frame_equal(data['fatos'], esperado, check_categorical=False)
+    venda = data['fatos'][data['fatos']['metrica'] == 'Venda'].groupby('ano')['n'].sum()
+    assert venda.loc[2023] == len(linhas) // 2 + 1
+
+
+def test_fatos_no_modo_multiarquivo(tmp_path):
+    arquivos = generate(str(tmp_path), lojas=3, meses=2, skus=100, sujeira=0, por_arquivo=True)
+    # O último arquivo passa a ter 2023 (com as linhas de outra loja sintética, a 'LOJA 0001')
+    ultima = sorted(os.listdir(arquivos['base_dir']))[-1]
+    _base_com_2023(os.path.join(arquivos['base_dir'], ultima), gerar_base(1, 2, 0, seed=5), ['10,00', '5,00'])
+    data, cache = _cache_da_leitura(str(tmp_path), base_dir=arquivos['base_dir'])
+    assert 'fatos' not in data['erros'] and not data['rejeitados']
+    fatos = data['fatos']
+    de_2023 = fatos[(fatos['metrica'] == 'Venda') & (fatos['ano'] == 2023)]
+    assert de_2023['valor'].sum() == pytest.approx(15.0) and de_2023['n'].sum() == 2
+    assert set(de_2023['Loja'].astype(str)) == {'LOJA 0001'}
+    # Segunda carga: tudo do cache por arquivo, mesmos fatos
+    de_novo, cache = _cache_da_leitura(str(tmp_path), base_dir=arquivos['base_dir'])
+    assert cache == '3/3 arquivos do cache'
+    pd.testing.assert_frame_equal(de_novo['fatos'], fatos)
+
+
+def test_erro_no_mix_fica_registrado(tmp_path, monkeypatch):
+    generate(str(tmp_path), lojas=2, meses=2, skus=50)
+
+    def quebrado(path):
+        raise ValueError("arquivo corrompido")
+    monkeypatch.setattr('union.ingest.read_mix', quebrado)
+    data = load_datasets(str(tmp_path), use_cache=False)
+    assert data['erros'] == {'mix': "arquivo corrompido"}
+    assert 'mix' not in data and 'base' in data
+
+
+@pytest.mark.parametrize('backend, duckdb', [('sqlite', True), ('duckdb', False)])
+def test_backend_indisponivel_cai_no_pandas(tmp_path, monkeypatch, caplog, backend, duckdb):
+    generate(str(tmp_path), lojas=2, meses=2, skus=50)
+    monkeypatch.setattr('union.query.QUERY_BACKEND', backend)
+    if not duckdb:
+        find_spec = importlib.util.find_spec
+        monkeypatch.setattr(importlib.util, 'find_spec',
+                            lambda nome, *a: None if nome == 'duckdb' else find_spec(nome, *a))
+    data = load_datasets(str(tmp_path), use_cache=False)
+    assert data['erros'] == {} and data['consultas'].nome == 'pandas'
+    assert 'usando pandas' in caplog.text
+
+
+def test_erro_no_backend_tira_a_base(tmp_path, monkeypatch):
+    generate(str(tmp_path), lojas=2, meses=2, skus=50)
+
+    def quebrado(datasets):
+        raise RuntimeError("sem backend")
+    monkeypatch.setattr('union.ingest.make_backend', quebrado)
+    data = load_datasets(str(tmp_path), use_cache=False)
+    assert data['erros'] == {'base': "sem backend"}
+    assert 'base' not in data and 'consultas' not in data and 'mix' in data
@@ -0,0 +1,30 @@
+import json
+
+from union import instrument
+from union.instrument import close_timing_logs, stage, tracing, write_record
+
+
+def test_log_desligado_por_padrao(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(instrument, 'TIMING_LOG', '')
+    with tracing('rerun'), stage('etapa'):
+        pass
+    close_timing_logs()
+    assert list(tmp_path.rglob('*')) == []
+
+
+def test_log_grava_e_gira(tmp_path, monkeypatch):
+    caminho = tmp_path / 'logs' / 'tempos.jsonl'
+    monkeypatch.setattr(instrument, 'TIMING_LOG', str(caminho))
+    monkeypatch.setattr(instrument, 'TIMING_LOG_MB', 1 / 1024)       # 1 KB
+    with tracing('rerun'), stage('etapa') as info:
+        info['linhas'] = 3
+    for k in range(100):
+        write_record({'k': k, 'texto': 'x' * 50})
+    close_timing_logs()
+
+    arquivos = sorted(caminho.parent.iterdir())
+    assert [a.name for a in arquivos] == ['tempos.jsonl', *(f'tempos.jsonl.{i}' for i in (1, 2, 3))]
+    assert all(a.stat().st_size <= 1024 for a in arquivos)
+    ultimas = [json.loads(linha) for linha in caminho.read_text(encoding='utf-8').splitlines()]
+    assert ultimas[-1]['k'] == 99
@@ -0,0 +1,41 @@
+import pytest
+
+from union.loadtest import Sessao, nivel, servidor
+from union.synth import generate
+
+pytest.importorskip('websockets')
+
+APP_COM_ERRO = '''
+import streamlit as st
+mes = st.selectbox("Período (Mês)", ["Todos", "JAN", "FEV"])
+if mes == "FEV":
+    raise ValueError("falha no script")
+st.metric("Venda Total", mes)
+'''
+
+
+def test_excecao_no_script_e_erro(tmp_path):
+    app = tmp_path / 'app.py'
+    app.write_text(APP_COM_ERRO, encoding='utf-8')
+    with servidor(str(tmp_path), app=str(app)) as (url, _):
+        sessao = Sessao(url)
+        try:
+            assert sessao.run() > 0
+            id_, opcoes = sessao.seletores["Período (Mês)"]
+            assert opcoes == ["Todos", "JAN", "FEV"]
+            sessao._widget(id_, "JAN")
+            sessao.run()
+            sessao._widget(id_, "FEV")
+            with pytest.raises(RuntimeError, match="falha no script"):
+                sessao.run()
+        finally:
+            sessao.close()
+
+
+def test_nivel_no_dashboard(tmp_path):
+    generate(str(tmp_path), lojas=3, meses=2, skus=200)
+    with servidor(str(tmp_path)) as (url, proc):
+        resultado = nivel(url, 2, 4, pid=proc.pid)
+    assert resultado['n_erros'] == 0, resultado['erros']
+    assert resultado['reruns'] == 8
+    assert resultado['rss_mb'] is None or resultado['rss_mb'] > 0
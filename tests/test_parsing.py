@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from union.parsing import (clean_currency_br, clean_int_br, clean_percentage_br, parse_currency_br,
+                           parse_int_br, parse_percentage_br, parse_percentage_thousands_br)
+from union.synth import SUJEIRA, inteiro_br, moeda_br, percentual_br
+
+PARES = [(clean_currency_br, parse_currency_br),
+         (clean_percentage_br, parse_percentage_br),
+         (clean_int_br, parse_int_br)]
+
+CELULAS = [
+    '  1.234,56 ', 'R$ 1.234,56', 'R$-5,5', '"1.234,56"', "'12'", '', '   ', None, np.nan,
+    '12,5%', '26,10%', '-0,00', '+3', '.5', '5.', '1.000', '13.514', '1.234,00', '1 234',
+    '1e3', '1,5e3', 'inf', '-inf', 'nan', '0x10', '١٢', *SUJEIRA,
+]
+
+
+def _aleatorias(n=2000, seed=1):
+    rng = np.random.default_rng(seed)
+    valores = rng.lognormal(10, 3, n) * rng.choice([-1, 1], n)
+    return (moeda_br(valores) + inteiro_br(rng.integers(-10 ** 9, 10 ** 9, n))
+            + percentual_br(rng.normal(20, 15, n)) + percentual_br(rng.normal(20, 15, n), sinal=''))
+
+
+def _mesmos_bytes(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    return a.dtype == b.dtype and a.tobytes() == b.tobytes()
+
+
+@pytest.mark.parametrize('clean, parse', PARES, ids=lambda f: f.__name__)
+@pytest.mark.parametrize('dtype', [object, 'str'])
+def test_parse_igual_a_referencia(clean, parse, dtype):
+    s = pd.Series(CELULAS + _aleatorias(), dtype=dtype)
+    esperado = np.array([clean(x) for x in s], dtype='int64' if clean is clean_int_br else 'float64')
+    obtido, _ = parse(s)
+    assert _mesmos_bytes(obtido.to_numpy(), esperado)
+
+
+@pytest.mark.parametrize('clean, parse', PARES, ids=lambda f: f.__name__)
+def test_parse_coluna_numerica(clean, parse):
+    # Colunas que o pandas já leu como número passam pelo str(x), como na referência
+    s = pd.Series([1.5, 2.0, np.nan, -3.25, 1e15], dtype=object)
+    esperado = np.array([clean(x) for x in s], dtype='int64' if clean is clean_int_br else 'float64')
+    assert _mesmos_bytes(parse(s)[0].to_numpy(), esperado)
+
+
+def test_contagem_de_falhas():
+    s = pd.Series(['1,00', '', None, '-', '#N/D', 'n/a', '1.234.56,7'])
+    # '1.234.56,7' vira 123456.7 na moeda (pontos saem) e 123456 no inteiro
+    assert parse_currency_br(s)[1] == 3
+    assert parse_percentage_br(s)[1] == 4
+    assert parse_int_br(s)[1] == 3
+
+
+def test_porcentagem_com_milhar():
+    s = pd.Series(['-2.924,13', '1.000', '12,5%', '"7,79"', '', 'x'])
+    valores, falhas = parse_percentage_thousands_br(s)
+    assert valores.tolist() == [-2924.13, 1000.0, 12.5, 7.79, 0.0, 0.0] and falhas == 1
+    # A porcentagem da referência não conhece o milhar
+    assert parse_percentage_br(s)[1] == 2
+
+
+def test_inteiro_fora_do_int64():
+    # A referência devolveria um int do Python; a coluna int64 conta falha e usa 0
+    valores, falhas = parse_int_br(pd.Series(['99999999999999999999', 'inf', '12']))
+    assert valores.tolist() == [0, 0, 12] and falhas == 2
@@ -0,0 +1,58 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from union.ingest import load_datasets
+from union.query import DuckDBBackend, PandasBackend, arrow_table, make_backend
+from union.synth import generate
+
+pytest.importorskip('duckdb')
+
+
+@pytest.fixture(scope='module')
+def backends(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp('dados')
+    generate(str(pasta), lojas=4, meses=3, skus=200)
+    data = load_datasets(str(pasta))
+    pandas = make_backend(data, 'pandas')
+    duck = make_backend(data, 'duckdb')
+    assert isinstance(pandas, PandasBackend) and isinstance(duck, DuckDBBackend)
+    return data, pandas, duck
+
+
+def _filtros(data):
+    meses = ['Todos', *data['opcoes']['Mes']]
+    lojas = ['Todas', *data['opcoes']['Loja']]
+    return list(itertools.product(meses, lojas)) + [('NÃO EXISTE', 'Todas')]
+
+
+def test_tabela_arrow_vem_do_cache(backends):
+    data, _, _ = backends
+    assert data['base_arquivos']
+    assert arrow_table(data['base'], data['base_arquivos']).num_rows == len(data['base'])
+
+
+def test_totais_iguais(backends):
+    data, pandas, duck = backends
+    for mes, loja in _filtros(data):
+        a, b = pandas.totals(mes, loja), duck.totals(mes, loja)
+        assert a.keys() == b.keys()
+        for k in a:
+            np.testing.assert_allclose(float(a[k]), float(b[k]), rtol=1e-9, equal_nan=True,
+                                       err_msg=f"{k} em {mes}/{loja}")
+
+
+@pytest.mark.parametrize('dim,medidas', [('Loja', ['Venda']), ('Mes', ['Venda', 'Meta']),
+                                         ('Loja', ['Venda', 'Meta', 'Clientes'])])
+def test_rollup_igual(backends, dim, medidas):
+    data, pandas, duck = backends
+    assert pandas.dims == duck.dims
+    for mes, loja in _filtros(data):
+        a = pandas.rollup(dim, medidas, mes, loja)
+        b = duck.rollup(dim, medidas, mes, loja)
+        a = a.assign(**{dim: a[dim].astype(str)}).set_index(dim).sort_index()
+        b = b.set_index(dim).sort_index()
+        assert list(a.index) == list(b.index), f"{dim} em {mes}/{loja}"
+        np.testing.assert_allclose(a[medidas].to_numpy(float), b[medidas].to_numpy(float),
+                                   rtol=1e-9, err_msg=f"{dim} em {mes}/{loja}")
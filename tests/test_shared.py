@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from union.shared import DatasetStore, freeze, session_view
+
+
+def _datasets():
+    base = pd.DataFrame({'Loja': pd.Categorical(['A', 'B', 'A']), 'Venda': [1.0, 2.0, 3.0],
+                         'Mes': ['JAN', 'JAN', 'FEV']})
+    return freeze({'base': base, 'erros': {}})
+
+
+def _original(data):
+    return data['base'][['Loja', 'Venda', 'Mes']].copy()
+
+
+@pytest.mark.parametrize('mexe', [
+    lambda df: df.__setitem__('Venda', 0.0),
+    lambda df: df.__delitem__('Venda'),
+    lambda df: df.rename(columns={'Venda': 'X'}, inplace=True),
+    lambda df: df.drop(columns=['Mes'], inplace=True),
+    lambda df: df.drop(index=[0], inplace=True),
+    lambda df: df.__setitem__('Nova', 1),
+    lambda df: df.loc.__setitem__((0, 'Venda'), 9.0),
+    lambda df: df.iloc.__setitem__((1, 1), 9.0),
+    lambda df: df['Loja'].cat.rename_categories(['X', 'Y']),
+    lambda df: df.sort_values('Venda', inplace=True),
+], ids=['setitem', 'del', 'rename', 'drop', 'drop_linha', 'coluna_nova', 'loc', 'iloc',
+        'categorias', 'sort'])
+def test_sessao_nao_altera_o_compartilhado(mexe):
+    data = _datasets()
+    antes = _original(data)
+    mexe(session_view(data)['base'])
+    pd.testing.assert_frame_equal(data['base'], antes)
+    # Outra sessão vê os dados intactos
+    pd.testing.assert_frame_equal(session_view(data)['base'], antes)
+
+
+def test_view_divide_os_buffers():
+    data = _datasets()
+    view = session_view(data)
+    assert view['base'] is not data['base']
+    assert np.shares_memory(view['base']['Venda'].to_numpy(), data['base']['Venda'].to_numpy())
+    assert view['erros'] == {}
+
+
+def test_congelado_recusa_escrita_de_valores():
+    data = _datasets()
+    with pytest.raises(ValueError):
+        data['base'].loc[0, 'Venda'] = 9.0
+    with pytest.raises(TypeError):
+        data['erros']['base'] = 'x'
+
+
+def test_store_entrega_views():
+    store = DatasetStore(lambda progresso: {'base': _datasets()['base'].copy()}, lambda: 1)
+    assert store.view() is None
+    store.refresh()
+    assinatura, data = store.view()
+    data['base']['Venda'] = 0.0
+    assert store.current[1]['base']['Venda'].tolist() == [1.0, 2.0, 3.0]
+    assert assinatura == 1
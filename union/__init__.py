@@ -0,0 +1,5 @@
+"""Pipeline de dados do dashboard Union (Data Sigma).
+
+O `app.py` cuida só da interface Streamlit; leitura, limpeza e agregação
+ficam aqui para poderem ser reutilizadas fora do Streamlit.
+"""
@@ -0,0 +1,162 @@
+"""Benchmark do pipeline: carga, limpeza, filtros e figuras de cada aba.
+
+    python -m union.bench --lojas 1000 --meses 60 --skus 200000 --json bench.json
+    python -m union.bench --pasta /caminho/dos/csvs
+
+Sem --pasta, gera os dados (union/synth.py) numa pasta temporária. Cada etapa
+roda `--repeat` vezes e reporta o melhor tempo de parede e o pico de memória
+alocada numa execução extra sob tracemalloc (Python e numpy; buffers do Arrow
+ficam de fora). No fim vai o pico de RSS do processo. O --json guarda tudo
+para comparar versões.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from union.executiva import kpi_deltas
+from union.facts import yearly, yoy
+from union.figures import donut_figure, evolucao_figure, gauge_figure, ranking_figure, treemap_figure
+from union.ingest import COL_MAP, find_sources, load_datasets, read_csv_conf, sniff
+from union.parsing import (clean_currency_br, clean_int_br, clean_percentage_br, parse_currency_br,
+                           parse_int_br, parse_percentage_br)
+from union.synth import generate
+from union.tables import sort_order
+
+# Filtros de sidebar testados: todos os meses com 'Todas' + as primeiras lojas com 'Todos'
+MAX_LOJAS_FILTRO = 20
+
+
+def medir(nome, fn, repeat=3):
+    """{'etapa', 'segundos' (melhor de `repeat`), 'pico_mb' (tracemalloc)} de `fn()`."""
+    tempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    try:
+        fn()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'etapa': nome, 'segundos': min(tempos), 'pico_mb': pico / 2 ** 20}
+
+
+def _colunas_brutas(base_file):
+    # Colunas de texto como saem do CSV, para medir as funções de limpeza isoladas
+    conf = sniff(base_file, COL_MAP)
+    nomes = {v: k for k, v in conf['mapping'].items()}
+    df = read_csv_conf(base_file, conf, dtype=str, usecols=lambda c: str(c).strip() in nomes.values())
+    df.columns = df.columns.str.strip()
+    return {v: df[k] for v, k in nomes.items() if k in df.columns}
+
+
+def run(pasta, repeat=3):
+    """Lista de medições de todas as etapas sobre os CSVs de `pasta`."""
+    resultados = []
+    etapa = lambda nome, fn, n=repeat: resultados.append(medir(nome, fn, n))
+
+    # Carga: sem cache (parse + limpeza + derivados) e com o cache em disco já pronto
+    etapa('load_datasets (sem cache)', lambda: load_datasets(pasta, use_cache=False), 1)
+    load_datasets(pasta)
+    etapa('load_datasets (cache)', lambda: load_datasets(pasta))
+    data = load_datasets(pasta)
+
+    base_file, _ = find_sources(pasta)
+    if base_file:
+        brutas = _colunas_brutas(base_file)
+        for col, escalar, vetor in [('Venda', clean_currency_br, parse_currency_br),
+                                    ('Margem_Perc', clean_percentage_br, parse_percentage_br),
+                                    ('Clientes', clean_int_br, parse_int_br)]:
+            if col in brutas:
+                s = brutas[col]
+                etapa(f"{escalar.__name__} ({len(s):,} células)", lambda s=s, f=escalar: s.map(f), 1)
+                etapa(f"{vetor.__name__} ({len(s):,} células)", lambda s=s, f=vetor: f(s))
+
+    consultas = data.get('consultas')
+    if consultas is not None:
+        opcoes = data['opcoes']
+        filtros = [('Todos', 'Todas')] + [(m, 'Todas') for m in opcoes.get('Mes', [])] \
+            + [('Todos', l) for l in opcoes.get('Loja', [])[:MAX_LOJAS_FILTRO]]
+
+        def aplicar_filtros():
+            for mes, loja in filtros:
+                consultas.totals(mes, loja)
+                consultas.rollup('Loja', ['Venda'], mes, loja)
+        etapa(f"filtros {consultas.nome} ({len(filtros)} combinações)", aplicar_filtros)
+
+        kpis = consultas.totals()
+        evolucao = consultas.rollup('Mes', ['Venda', 'Meta'])
+        lojas = consultas.rollup('Loja', ['Venda', 'Meta', 'Clientes'])
+        etapa('aba 1: evolucao_figure', lambda: evolucao_figure(evolucao, 'Mes'))
+        etapa('aba 1: gauge_figure', lambda: gauge_figure(kpis['venda'], kpis['meta']))
+        etapa('aba 1: ranking_figure', lambda: ranking_figure(lojas[['Loja', 'Venda']]))
+        etapa('aba 1: serialização (to_json)', lambda: evolucao_figure(evolucao, 'Mes').to_json())
+        etapa('aba 3: rollup + ordenação', lambda: sort_order(
+            consultas.rollup('Loja', ['Venda', 'Meta', 'Clientes'])['Venda'], False))
+
+    fatos = data.get('fatos')
+    if fatos is not None:
+        etapa(f"fatos por ano: yearly + yoy ({len(fatos):,} linhas)", lambda: yoy(yearly(fatos)))
+    if data.get('fatos_cubo') is not None:
+        cubo, indice = data['fatos_cubo'], data['fatos_idx']
+        loja = data.get('opcoes', {}).get('Loja', ['Todas'])[0]
+        etapa('aba 1: kpi_deltas (Todos/Todas)', lambda: kpi_deltas(cubo, indice=indice))
+        etapa(f"aba 1: kpi_deltas (Todos/{loja})", lambda: kpi_deltas(cubo, loja=loja, indice=indice))
+
+    mix, arvore = data.get('mix'), data.get('arvore')
+    if mix is not None and arvore is not None:
+        etapa('aba 1: donut_figure', lambda: donut_figure(mix, arvore))
+        for nivel in (1, 2, 3, 4):
+            etapa(f"aba 2: treemap_figure nível {nivel}", lambda n=nivel: treemap_figure(mix, arvore, n))
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pasta', help="CSVs já existentes (senão gera dados sintéticos)")
+    parser.add_argument('--lojas', type=int, default=100)
+    parser.add_argument('--meses', type=int, default=12)
+    parser.add_argument('--skus', type=int, default=20000)
+    parser.add_argument('--encoding', choices=['utf-8', 'latin1'], default='utf-8')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='union-bench-') as tmp:
+        pasta = args.pasta
+        if not pasta:
+            pasta = tmp
+            print(f"gerando {args.lojas} lojas × {args.meses} meses, ~{args.skus:,} SKUs ({args.encoding})...",
+                  file=sys.stderr)
+            generate(pasta, args.lojas, args.meses, args.skus, args.encoding)
+        # Cache do benchmark não se mistura com o do app
+        os.environ['UNION_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        resultados = run(pasta, args.repeat)
+
+    largura = max(len(r['etapa']) for r in resultados)
+    print(f"{'etapa':<{largura}}  {'tempo (s)':>10}  {'pico (MB)':>10}")
+    for r in resultados:
+        print(f"{r['etapa']:<{largura}}  {r['segundos']:>10.4f}  {r['pico_mb']:>10.1f}")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"pico de RSS do processo: {rss:,.0f} MB")
+
+    if args.json:
+        saida = {'escala': {'pasta': args.pasta, 'lojas': args.lojas, 'meses': args.meses,
+                            'skus': args.skus, 'encoding': args.encoding},
+                 'versoes': {'python': platform.python_version(), 'pandas': pd.__version__},
+                 'pico_rss_mb': rss, 'etapas': resultados}
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(saida, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""Cache colunar em disco (Arrow IPC) dos datasets já limpos.
+
+Cada dataset vira `<nome>-<chave>.arrow` + `<nome>.json` (manifesto) dentro
+de `.union_cache/` (ou de UNION_CACHE_DIR). A chave combina caminho, tamanho,
+mtime e hash do conteúdo de cada arquivo de origem, mais a versão do pipeline;
+qualquer mudança gera outra chave e o dataset é reconstruído. A leitura é feita
+por memory-map, sem passar pelo parser de CSV.
+
+Arquivos que só crescem no fim (a base exportada pelo ERP) usam
+`cached_growing_frame`, que ingere apenas as linhas novas.
+"""
+import hashlib
+import json
+import logging
+import os
+
+import pyarrow as pa
+
+from union.instrument import mark
+
+log = logging.getLogger(__name__)
+
+CACHE_DIRNAME = '.union_cache'
+_HASH_CHUNK = 1 << 20
+
+
+def cache_dir(pasta='.'):
+    return os.environ.get('UNION_CACHE_DIR') or os.path.join(pasta, CACHE_DIRNAME)
+
+
+def content_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_fingerprint(path, known=None):
+    """{path, size, mtime_ns, hash} de `path`.
+
+    Se `known` (impressão anterior) tem o mesmo caminho, tamanho e mtime, o hash
+    é reaproveitado em vez de reler o arquivo inteiro.
+    """
+    st = os.stat(path)
+    fp = {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if known and all(known.get(k) == fp[k] for k in ('path', 'size', 'mtime_ns')):
+        fp['hash'] = known['hash']
+    else:
+        fp['hash'] = content_hash(path)
+    return fp
+
+
+def _key(fingerprints, version):
+    raw = json.dumps({'v': version, 'src': [(f['path'], f['size'], f['mtime_ns'], f['hash'])
+                                            for f in fingerprints]}, sort_keys=True)
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+def _read_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _atomic_write(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+
+def write_frame(path, df):
+    table = pa.Table.from_pandas(df)
+    def write(tmp):
+        with pa.OSFile(tmp, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    _atomic_write(path, write)
+
+
+def read_frame(path):
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def cache_entry(name, sources, version=0, pasta='.'):
+    """Situação do cache de `name` para os arquivos `sources` (ver `read_entry`/`write_entry`)."""
+    folder = cache_dir(pasta)
+    manifest_path = os.path.join(folder, f"{name}.json")
+    manifest = _read_manifest(manifest_path) or {}
+    known = {f['path']: f for f in manifest.get('sources', [])}
+    fingerprints = [file_fingerprint(p, known.get(os.path.abspath(p))) for p in sources]
+    return {'name': name, 'folder': folder, 'manifest_path': manifest_path, 'manifest': manifest,
+            'sources': fingerprints, 'key': _key(fingerprints, version)}
+
+
+def read_entry(entry):
+    """(df, meta) gravados para a chave atual, ou None se o cache não serve."""
+    manifest = entry['manifest']
+    if manifest.get('key') != entry['key']:
+        return None
+    try:
+        return read_frame(os.path.join(entry['folder'], manifest['file'])), manifest.get('meta', {})
+    except (OSError, pa.ArrowException, KeyError) as e:
+        log.warning("cache %s ilegível, reconstruindo: %s", entry['name'], e)
+        return None
+
+
+def write_entry(entry, df, meta):
+    """Grava `df` e `meta` para a chave atual; falhas de E/S só geram aviso no log."""
+    folder, name, key = entry['folder'], entry['name'], entry['key']
+    try:
+        os.makedirs(folder, exist_ok=True)
+        data_file = f"{name}-{key}.arrow"
+        write_frame(os.path.join(folder, data_file), df)
+        new_manifest = {'key': key, 'file': data_file, 'sources': entry['sources'], 'meta': meta}
+        _atomic_write(entry['manifest_path'], lambda tmp: _dump_json(tmp, new_manifest))
+        old = entry['manifest'].get('file')
+        if old and old != data_file and os.path.exists(os.path.join(folder, old)):
+            os.remove(os.path.join(folder, old))
+    except (OSError, pa.ArrowException, TypeError, ValueError) as e:
+        log.warning("não foi possível gravar o cache %s: %s", name, e)
+
+
+def cached_file(name, pasta='.'):
+    """Arquivo Arrow atual do dataset `name` (para leitura direta, ex.: DuckDB), ou None."""
+    folder = cache_dir(pasta)
+    manifest = _read_manifest(os.path.join(folder, f"{name}.json")) or {}
+    path = os.path.join(folder, manifest['file']) if manifest.get('file') else None
+    return path if path and os.path.exists(path) else None
+
+
+def cached_frame(name, sources, build, version=0, pasta='.'):
+    """DataFrame `name` do cache, ou `build()` (-> (df, meta)) se a chave mudou.
+
+    `meta` precisa ser serializável em JSON; volta junto com o DataFrame nas
+    leituras seguintes. Falhas de E/S no cache nunca impedem o carregamento.
+    """
+    entry = cache_entry(name, sources, version, pasta)
+    hit = read_entry(entry)
+    if hit is not None:
+        mark(cache='hit')
+        return hit
+    mark(cache='miss')
+    df, meta = build()
+    write_entry(entry, df, meta)
+    return df, meta
+
+
+def cached_growing_frame(name, path, build, extend, version=0, pasta='.'):
+    """Como `cached_frame`, para um arquivo que só recebe linhas novas no fim.
+
+    O manifesto guarda até que byte (`offset`, sempre fim de linha completa) o
+    arquivo já foi ingerido, quantas linhas isso deu (`rows`) e o hash desses
+    bytes. Se o arquivo cresceu e esse trecho inicial continua idêntico, só a
+    cauda é processada: `extend(df_ate_offset, meta, offset)` -> (df, meta).
+    Qualquer alteração antes do `offset` leva a `build()` completo.
+    """
+    folder = cache_dir(pasta)
+    manifest_path = os.path.join(folder, f"{name}.json")
+    manifest = _read_manifest(manifest_path) or {}
+    st = os.stat(path)
+    src = {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    same_pipeline = manifest.get('version') == version and manifest.get('path') == src['path']
+
+    cached = None
+    if same_pipeline and manifest.get('file'):
+        try:
+            cached = read_frame(os.path.join(folder, manifest['file']))
+        except (OSError, pa.ArrowException) as e:
+            log.warning("cache %s ilegível, reconstruindo: %s", name, e)
+
+    if cached is not None and (manifest['size'], manifest['mtime_ns']) == (src['size'], src['mtime_ns']):
+        mark(cache='hit')
+        return cached, manifest.get('meta', {})
+
+    old_offset = manifest.get('offset', 0) if cached is not None else 0
+    scan = _scan(path, old_offset)
+    meta = manifest.get('meta', {})
+
+    if cached is not None and scan['hash'] == manifest.get('hash'):
+        df = cached    # só o mtime mudou
+        mark(cache='hit')
+    elif cached is not None and scan['prefix_hash'] == manifest.get('prefix_hash') and scan['size'] > old_offset:
+        log.info("%s cresceu %d bytes, ingerindo só a cauda", name, scan['size'] - old_offset)
+        mark(cache='cauda')
+        df, meta = extend(cached.iloc[:manifest['rows']], meta, old_offset)
+    else:
+        mark(cache='miss')
+        df, meta = build()
+
+    # Linha final sem quebra de linha (gravação em andamento) fica fora do offset
+    # e é relida junto com a próxima cauda
+    rows = len(df) - (1 if scan['partial'] else 0)
+    new_manifest = dict(src, version=version, hash=scan['hash'], offset=scan['offset'],
+                        prefix_hash=scan['offset_hash'], rows=rows, meta=meta)
+    try:
+        os.makedirs(folder, exist_ok=True)
+        data_file = f"{name}-{scan['hash'][:16]}.arrow"
+        if df is not cached:
+            write_frame(os.path.join(folder, data_file), df)
+        else:
+            data_file = manifest['file']
+        new_manifest['file'] = data_file
+        _atomic_write(manifest_path, lambda tmp: _dump_json(tmp, new_manifest))
+        old = manifest.get('file')
+        if old and old != data_file and os.path.exists(os.path.join(folder, old)):
+            os.remove(os.path.join(folder, old))
+    except (OSError, pa.ArrowException, TypeError, ValueError) as e:
+        log.warning("não foi possível gravar o cache %s: %s", name, e)
+    return df, meta
+
+
+def _scan(path, old_offset):
+    """Lê o arquivo uma vez: hash até `old_offset`, hash total e o novo offset."""
+    h = hashlib.blake2b(digest_size=16)
+    prefix_hash = h.hexdigest() if old_offset == 0 else None
+    pos = 0
+    last_nl = -1
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            if prefix_hash is None and pos + len(chunk) >= old_offset:
+                cut = old_offset - pos
+                h.update(chunk[:cut])
+                prefix_hash = h.hexdigest()
+                h.update(chunk[cut:])
+            else:
+                h.update(chunk)
+            nl = chunk.rfind(b'\n')
+            if nl >= 0: last_nl = pos + nl
+            pos += len(chunk)
+    offset = last_nl + 1
+    # hash de [0, offset) para a próxima comparação
+    offset_hash = _prefix_hash(path, offset) if offset != pos else h.hexdigest()
+    return {'size': pos, 'hash': h.hexdigest(), 'prefix_hash': prefix_hash,
+            'offset': offset, 'offset_hash': offset_hash, 'partial': offset != pos}
+
+
+def _prefix_hash(path, n):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while n > 0:
+            chunk = f.read(min(_HASH_CHUNK, n))
+            if not chunk: break
+            h.update(chunk)
+            n -= len(chunk)
+    return h.hexdigest()
+
+
+def _dump_json(path, obj):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False)
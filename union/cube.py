@@ -0,0 +1,74 @@
+"""Cubo agregado Mês × Loja da base geral.
+
+Montado uma vez no carregamento; KPIs, gráficos e tabelas leem fatias dele
+em vez de filtrar e agrupar as linhas da base a cada interação. O custo de
+um filtro passa a ser proporcional ao número de lojas × meses.
+"""
+import numpy as np
+
+from union.filters import build_filter_index, select_rows
+
+DIMENSOES = ['Mes', 'Loja']
+MEDIDAS = ['Venda', 'Meta', 'Clientes']
+
+
+def build_cube(df):
+    """Somas por (Mes, Loja) + insumos da margem média (soma e contagem de Margem_Perc).
+
+    As linhas sem Mes/Loja continuam no cubo (chave nula): entram nos totais
+    de 'Todos'/'Todas', como acontecia filtrando a base.
+    """
+    dims = [d for d in DIMENSOES if d in df.columns]
+    medidas = [m for m in MEDIDAS if m in df.columns]
+    work = df[dims + medidas].copy()
+    # A base guarda float32/int32 (ver union/ingest.py); as somas são em 64 bits
+    for m in medidas:
+        if work[m].dtype.itemsize < 8:
+            work[m] = work[m].astype(f"{work[m].dtype.kind}8")
+    if 'Margem_Perc' in df.columns:
+        work['Margem_soma'] = df['Margem_Perc'].astype('float64')
+        work['Margem_n'] = df['Margem_Perc'].notna().astype('int64')
+    if not dims:
+        return work.sum().to_frame().T
+    return work.groupby(dims, dropna=False, observed=True, sort=True).sum(min_count=0)
+
+
+def build_cube_index(cubo):
+    """Posições das células do cubo por Mes e por Loja (ver union/filters.py)."""
+    return build_filter_index(cubo.index.to_frame(index=False), DIMENSOES)
+
+
+def slice_cube(cubo, mes='Todos', loja='Todas', indice=None):
+    """Células do cubo que passam nos filtros da sidebar.
+
+    Com o `indice` de `build_cube_index` o filtro é uma interseção de posições;
+    sem ele, uma comparação sobre os níveis do índice do cubo.
+    """
+    filtros = {}
+    if mes != 'Todos': filtros['Mes'] = mes
+    if loja != 'Todas': filtros['Loja'] = loja
+    if indice is not None:
+        pos = select_rows(indice, filtros)
+        return cubo if pos is None else cubo.iloc[pos]
+    mask = np.ones(len(cubo), dtype=bool)
+    for dim, valor in filtros.items():
+        if dim in cubo.index.names:
+            mask &= (cubo.index.get_level_values(dim) == valor)
+    return cubo[mask]
+
+
+def totals(fatia):
+    """KPIs de uma fatia: {'venda', 'meta', 'clientes', 'margem'}."""
+    soma = lambda c: fatia[c].sum() if c in fatia.columns else 0
+    if 'Margem_n' in fatia.columns:
+        n = fatia['Margem_n'].sum()
+        margem = fatia['Margem_soma'].sum() / n if n else np.nan
+    else:
+        margem = 0
+    return {'venda': soma('Venda'), 'meta': soma('Meta'),
+            'clientes': soma('Clientes'), 'margem': margem}
+
+
+def rollup(fatia, dim, medidas):
+    """Soma de `medidas` por `dim` ('Mes' ou 'Loja'), como um groupby na base filtrada."""
+    return fatia.groupby(level=dim, observed=True)[medidas].sum().reset_index()
@@ -0,0 +1,105 @@
+"""Conteúdo da aba "Visão Executiva": KPIs formatados e os quatro gráficos.
+
+Compartilhado pelo app e pelo export em lote (union/export.py), para que o
+relatório estático mostre exatamente o que a aba mostra para o mesmo filtro.
+"""
+import numpy as np
+
+from union.cube import slice_cube
+from union.facts import year_totals
+from union.figures import donut_figure, evolucao_figure, gauge_figure, ranking_figure
+from union.ingest import BASE_YEAR
+
+# Métricas dos fatos por ano que os cartões comparam (ver `kpi_deltas`)
+METRICAS_CARTOES = ('Venda', 'Clientes', 'Margem_Perc')
+
+# Ordem e títulos dos gráficos da aba (linha 1: evolução | gauge; linha 2: donut | ranking)
+TITULOS = {
+    'evolucao': "📈 Evolução vs Metas",
+    'gauge': "🎯 Atingimento Global",
+    'donut': "🍰 Distribuição por Departamento (Top 5)",
+    'ranking': "🏆 Ranking de Lojas",
+}
+
+
+def brl(valor):
+    """R$ no formato brasileiro: R$ 1.234,56."""
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def kpi_cards(kpis, deltas=None):
+    """[(rótulo, valor formatado, variação ou None)] dos cartões.
+
+    `kpis` vem de `totals` do backend; `deltas` de `kpi_deltas`.
+    """
+    venda, clientes, margem = kpis['venda'], kpis['clientes'], kpis['margem']
+    # Cálculo seguro do ticket
+    ticket = venda / clientes if clientes > 0 else 0
+    deltas = deltas or {}
+    cards = [
+        ("Venda Total", brl(venda)),
+        ("Margem", f"{margem:.1f}%"),
+        ("Ticket Médio", brl(ticket)),
+        ("Clientes Atendidos", f"{clientes:,.0f}".replace(",", ".")),
+    ]
+    return [(rotulo, valor, deltas.get(rotulo)) for rotulo, valor in cards]
+
+
+def kpi_deltas(cubo, mes='Todos', loja='Todas', ano=BASE_YEAR, indice=None):
+    """{rótulo do cartão: variação sobre o ano anterior} a partir dos fatos por ano.
+
+    `cubo` e `indice` são o `year_cube` dos fatos e o índice dele, montados na
+    carga: aqui só a fatia do filtro é somada. Compara `ano` (o das colunas de
+    COL_MAP, que os cartões mostram) com o maior ano anterior a ele em que
+    alguma métrica dos cartões tem valor. Anos posteriores não entram. Vazio
+    sem cubo ou sem um dos dois anos.
+    """
+    if cubo is None or cubo.empty:
+        return {}
+    totais = year_totals(slice_cube(cubo, mes, loja, indice))
+    anos = {a for m, a in totais if m in METRICAS_CARTOES}
+    anteriores = [a for a in anos if a < ano]
+    if ano not in anos or not anteriores:
+        return {}
+    anterior = max(anteriores)
+
+    def valor(metrica, a):
+        if metrica == 'Ticket':
+            clientes = totais.get(('Clientes', a), np.nan)
+            return totais.get(('Venda', a), np.nan) / clientes if clientes > 0 else np.nan
+        return totais.get((metrica, a), np.nan)
+
+    deltas = {}
+    for rotulo, metrica, relativa, unidade in [("Venda Total", 'Venda', True, '%'),
+                                               ("Margem", 'Margem_Perc', False, ' p.p.'),
+                                               ("Ticket Médio", 'Ticket', True, '%'),
+                                               ("Clientes Atendidos", 'Clientes', True, '%')]:
+        atual, antes = valor(metrica, ano), valor(metrica, anterior)
+        if relativa:
+            variacao = (atual / antes - 1) * 100 if antes != 0 else np.nan
+        else:
+            variacao = atual - antes
+        if np.isfinite(variacao):
+            deltas[rotulo] = f"{variacao:+.1f}{unidade} vs {anterior}"
+    return deltas
+
+
+def graficos(consultas, kpis, df_mix, arvore, mes='Todos', loja='Todas'):
+    """{nome: (filtros, build)} dos gráficos disponíveis para o filtro `mes`/`loja`.
+
+    `build()` devolve o `go.Figure`; `filtros` são as entradas dele além dos
+    dados (para chaves de cache). Gráficos sem dados para montar ficam de fora.
+    """
+    saida = {}
+    if 'Mes' in consultas.dims:
+        idx_col = 'Mes' if mes == 'Todos' else 'Loja'
+        saida['evolucao'] = ((mes, loja), lambda: evolucao_figure(
+            consultas.rollup(idx_col, ['Venda', 'Meta'], mes, loja), idx_col))
+    saida['gauge'] = ((mes, loja), lambda: gauge_figure(kpis['venda'], kpis['meta']))
+    if df_mix is not None and not df_mix.empty and 'Descricao' in df_mix.columns:
+        # Só depende do mix: não muda com os filtros
+        saida['donut'] = ((), lambda: donut_figure(df_mix, arvore))
+    if 'Loja' in consultas.dims:
+        saida['ranking'] = ((mes, loja), lambda: ranking_figure(
+            consultas.rollup('Loja', ['Venda'], mes, loja)))
+    return saida
@@ -0,0 +1,209 @@
+"""Export em lote da Visão Executiva: um relatório estático por Loja × Mês.
+
+    python -m union.export relatorios/ --workers 8
+    python -m union.export relatorios/ --loja "LOJA 0001" --png
+
+Os dados são carregados e agregados uma vez só, no processo principal
+(`load_datasets`: cubo Mês × Loja e fatos por ano). Os workers de um pool de processos
+recebem o cubo ao iniciar (no Linux, por fork, sem cópia) e montam KPIs e
+gráficos com o mesmo código da aba (union/executiva.py). Os relatórios são
+HTML que abrem sem rede: o plotly.js vai uma vez só em <pasta>/plotly.min.js
+(--plotlyjs inline o embute em cada arquivo, ~4,8 MB a mais por relatório);
+--png grava também uma imagem (precisa do kaleido, opcional).
+
+Saída: <pasta>/<loja>/<NN>-<mês>.html, com 'Todas'/'Todos' para os totais.
+Lojas cujos nomes dariam a mesma pasta ('LOJA 01/A' e 'LOJA 01 A') ganham
+um sufixo tirado do nome original, em vez de uma sobrescrever a outra.
+"""
+import argparse
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+from plotly.subplots import make_subplots
+
+from union.executiva import TITULOS, graficos, kpi_cards, kpi_deltas
+from union.figures import COLOR_ALERT, COLOR_BLUE, COLOR_GREEN, COLOR_TEXT, update_fig_layout
+from union.ingest import load_datasets
+from union.instrument import stage, tracing
+from union.query import make_backend
+
+# Posição de cada gráfico numa grade de 6 colunas, como na aba: 2/3 + 1/3, depois 1/2 + 1/2
+GRADE = {'evolucao': (1, 1, 4, 'xy'), 'gauge': (1, 5, 2, 'domain'),
+         'donut': (2, 1, 3, 'domain'), 'ranking': (2, 4, 3, 'xy')}
+LARGURA, ALTURA = 1400, 900
+
+# Dados compartilhados pelos workers (ver `_init`)
+_dados = None
+
+
+def slug(valor):
+    """Nome de arquivo seguro para um valor de filtro ('LOJA 01/A' -> 'LOJA_01_A')."""
+    return re.sub(r'[^\w.-]+', '_', str(valor)).strip('_') or '_'
+
+
+def folders(valores):
+    """{valor: nome de pasta} sem colisões entre os `slug` dos valores.
+
+    Quando dois valores dão o mesmo slug (sem diferenciar maiúsculas, como em
+    sistemas de arquivos que não diferenciam), cada um deles ganha um sufixo
+    com o hash do nome original, que não depende de quais outros valores existem.
+    """
+    slugs = {v: slug(v) for v in valores}
+    contagem = {}
+    for s in slugs.values():
+        contagem[s.lower()] = contagem.get(s.lower(), 0) + 1
+    return {v: s if contagem[s.lower()] == 1 else
+            f"{s}-{hashlib.sha1(str(v).encode('utf-8')).hexdigest()[:8]}"
+            for v, s in slugs.items()}
+
+
+def relatorio_figure(titulo, cards, figs):
+    """Uma figura só com os cartões de KPI e os gráficos de `figs` no layout da aba."""
+    specs = [[None] * 6, [None] * 6]
+    for linha, coluna, largura, tipo in GRADE.values():
+        specs[linha - 1][coluna - 1] = {'type': tipo, 'colspan': largura}
+    fig = make_subplots(rows=2, cols=6, specs=specs, subplot_titles=[TITULOS[n] for n in GRADE],
+                        vertical_spacing=0.12, horizontal_spacing=0.06)
+    for nome, (linha, coluna, _, _) in GRADE.items():
+        if nome in figs:
+            for trace in figs[nome].data:
+                fig.add_trace(trace, row=linha, col=coluna)
+    if 'donut' in figs:
+        fig.update_layout(piecolorway=figs['donut'].layout.piecolorway)
+
+    # Cartões de KPI acima da grade
+    for k, (rotulo, valor, delta) in enumerate(cards):
+        x = (k + 0.5) / len(cards)
+        fig.add_annotation(x=x, y=1, yref='paper', xref='paper', yanchor='bottom', yshift=80,
+                           text=rotulo, showarrow=False, font={'size': 14, 'color': COLOR_TEXT})
+        fig.add_annotation(x=x, y=1, yref='paper', xref='paper', yanchor='bottom', yshift=45,
+                           text=f"<b>{valor}</b>", showarrow=False, font={'size': 24, 'color': COLOR_BLUE})
+        if delta:
+            cor = COLOR_ALERT if delta.startswith('-') else COLOR_GREEN
+            fig.add_annotation(x=x, y=1, yref='paper', xref='paper', yanchor='bottom', yshift=22,
+                               text=delta, showarrow=False, font={'size': 13, 'color': cor})
+    fig = update_fig_layout(fig)
+    fig.update_layout(title={'text': titulo, 'x': 0.01}, width=LARGURA, height=ALTURA,
+                      margin=dict(t=170, l=20, r=20, b=20), paper_bgcolor='white',
+                      legend=dict(orientation='h', y=-0.05))
+    return fig
+
+
+def _init(dados):
+    global _dados
+    _dados = dados
+
+
+def render(job):
+    """Grava o relatório de `job` = (mês, loja, caminho sem extensão); devolve os arquivos."""
+    mes, loja, destino = job
+    consultas = _dados['consultas']
+    kpis = consultas.totals(mes, loja)
+    # O donut só depende do mix: vem pronto do processo principal
+    figs = {nome: build() for nome, (_, build) in graficos(consultas, kpis, None, None, mes, loja).items()}
+    if _dados['donut'] is not None:
+        figs['donut'] = pio.from_json(_dados['donut'])
+
+    cards = kpi_cards(kpis, kpi_deltas(_dados['fatos_cubo'], mes, loja, indice=_dados['fatos_idx']))
+    fig = relatorio_figure(f"Visão Executiva — {loja} — {mes}", cards, figs)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    arquivos = [destino + '.html']
+    fig.write_html(arquivos[0], include_plotlyjs=_dados['plotlyjs'], config={'displaylogo': False})
+    if _dados['png']:
+        arquivos.append(destino + '.png')
+        fig.write_image(arquivos[1], width=LARGURA, height=ALTURA)
+    return arquivos
+
+
+def jobs(saida, opcoes, meses=None, lojas=None):
+    """(mês, loja, destino) de cada combinação, incluindo os totais 'Todos'/'Todas'."""
+    todos_meses = ['Todos', *opcoes.get('Mes', [])]
+    todas_lojas = ['Todas', *opcoes.get('Loja', [])]
+    pastas = folders(todas_lojas)
+    return [(mes, loja, os.path.join(saida, pastas[loja], f"{i:02d}-{slug(mes)}"))
+            for loja in todas_lojas if not lojas or loja in lojas
+            for i, mes in enumerate(todos_meses) if not meses or mes in meses]
+
+
+def export(pasta, saida, workers=None, meses=None, lojas=None, png=False, plotlyjs='arquivo'):
+    """Gera os relatórios de `pasta` em `saida`; devolve a lista de arquivos escritos.
+
+    `plotlyjs='arquivo'` grava um `plotly.min.js` em `saida` e os HTML apontam
+    para ele; 'inline' embute os ~4,8 MB em cada relatório (HTML avulso).
+    """
+    with tracing('export'):
+        with stage('carga') as info:
+            data = load_datasets(pasta)
+            if 'cubo' not in data:
+                raise ValueError(f"base de dados não encontrada em {pasta!r}")
+            # Sempre o cubo pandas: cabe na memória e atravessa o fork/pickle, o DuckDB não
+            consultas = make_backend(data, 'pandas')
+            mix, arvore = data.get('mix'), data.get('arvore')
+            builds = graficos(consultas, consultas.totals(), mix, arvore)
+            donut = builds['donut'][1]().to_json() if 'donut' in builds else None
+            info['linhas'] = len(data['base'])
+
+        lista = jobs(saida, data['opcoes'], meses, lojas)
+        os.makedirs(saida, exist_ok=True)
+        escritos = []
+        if plotlyjs == 'arquivo':
+            escritos.append(os.path.join(saida, 'plotly.min.js'))
+            with open(escritos[0], 'w', encoding='utf-8') as f:
+                f.write(get_plotlyjs())
+            plotlyjs = '../plotly.min.js'
+        else:
+            plotlyjs = True
+        dados = {'consultas': consultas, 'fatos_cubo': data.get('fatos_cubo'),
+                 'fatos_idx': data.get('fatos_idx'), 'donut': donut, 'png': png, 'plotlyjs': plotlyjs}
+
+        with stage('relatórios') as info:
+            info['linhas'] = len(lista)
+            workers = workers or os.cpu_count() or 1
+            if workers == 1:
+                _init(dados)
+                resultados = map(render, lista)
+            else:
+                # fork: os workers herdam `dados` sem serializar (onde houver)
+                contexto = multiprocessing.get_context(
+                    'fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+                pool = ProcessPoolExecutor(workers, mp_context=contexto, initializer=_init,
+                                           initargs=(dados,))
+                resultados = pool.map(render, lista, chunksize=max(1, len(lista) // (workers * 8)))
+            try:
+                for k, arquivos in enumerate(resultados, start=1):
+                    escritos.extend(arquivos)
+                    if k % 50 == 0 or k == len(lista):
+                        print(f"{k}/{len(lista)} relatórios", file=sys.stderr)
+            finally:
+                if workers > 1:
+                    pool.shutdown()
+    return escritos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('saida', help="pasta dos relatórios")
+    parser.add_argument('--pasta', default='.', help="pasta dos CSVs (padrão: a atual)")
+    parser.add_argument('--workers', type=int, help="processos em paralelo (padrão: nº de CPUs)")
+    parser.add_argument('--mes', action='append', help="só estes meses (repetível; 'Todos' = total)")
+    parser.add_argument('--loja', action='append', help="só estas lojas (repetível; 'Todas' = rede)")
+    parser.add_argument('--png', action='store_true', help="grava também PNG (requer kaleido)")
+    parser.add_argument('--plotlyjs', choices=['arquivo', 'inline'], default='arquivo',
+                        help="plotly.js num arquivo único na saída (padrão) ou embutido em cada HTML")
+    args = parser.parse_args(argv)
+    if args.png and importlib.util.find_spec('kaleido') is None:
+        parser.error("--png precisa do kaleido (pip install kaleido)")
+
+    escritos = export(args.pasta, args.saida, args.workers, args.mes, args.loja, args.png, args.plotlyjs)
+    print(f"{len(escritos)} arquivos em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
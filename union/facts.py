@@ -0,0 +1,158 @@
+"""Tabela de fatos longa (métrica, ano, Mês, Loja) com as colunas por ano da base.
+
+O export do ERP repete cada métrica uma vez por ano em colunas largas
+("Venda 2021 R$", "Venda 2022 R$", "Qtd de cupom 2021"...). Elas são lidas
+junto com a base, na mesma passada e no mesmo cache (ver `read_plan` em
+union/ingest.py); `build_facts` as reduz por Mês × Loja e `melt_years` empilha
+o resultado numa tabela só, sem laço por linha. Comparações entre anos (YoY) e
+tendências saem de um único groupby sobre ela (`yearly`, `yoy`): um ano a mais
+é uma fatia a mais da tabela, não outra passada do pipeline.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# Um ano no nome da coluna ('Estoques 2021 (R$)', 'Meta Margem Bruta %  2022')
+ANO = re.compile(r'(?<!\d)(?:19|20)\d{2}(?!\d)')
+# Métrica (cabeçalho sem o ano) -> nome usado no dashboard, como em COL_MAP
+METRICAS = {
+    'Venda R$': 'Venda', 'Meta Venda': 'Meta',
+    'Margem Bruta %': 'Margem_Perc', 'Qtd de cupom': 'Clientes'
+}
+# Só as colunas por ano dessas métricas vão para os fatos (e são lidas da base)
+METRICAS_FATOS = frozenset(METRICAS.values())
+DIMENSOES = ['Mes', 'Loja']
+
+
+def split_year(coluna):
+    """'Venda 2021 R$' -> ('Venda', 2021); None para colunas sem (ou com mais de um) ano."""
+    anos = ANO.findall(coluna)
+    if len(anos) != 1:
+        return None
+    metrica = ' '.join(ANO.sub(' ', coluna).split())
+    return METRICAS.get(metrica, metrica), int(anos[0])
+
+
+def year_columns(columns):
+    """{coluna do arquivo: (métrica, ano)} das colunas com ano no nome."""
+    achadas = {c: split_year(c) for c in columns}
+    return {c: v for c, v in achadas.items() if v}
+
+
+def metric_type(metrica):
+    """Tipo BR (union/parsing.py) de uma métrica: percentual, inteiro ou moeda."""
+    if '%' in metrica or metrica == 'Margem_Perc':
+        return 'percentual'
+    if metrica == 'Clientes' or metrica.lower().startswith('qtd'):
+        return 'inteiro'
+    return 'moeda'
+
+
+def melt_years(df, colunas, dims=DIMENSOES):
+    """Tabela larga (dimensões + colunas por ano já numéricas) -> uma linha por célula.
+
+    `colunas`: {coluna: (métrica, ano)}, como em `year_columns`. Os valores de
+    todas as colunas são empilhados num vetor só e as dimensões repetidas por
+    código de categoria. Células NaN ficam de fora.
+    """
+    n, k = len(df), len(colunas)
+    metricas = list(dict.fromkeys(m for m, _ in colunas.values()))
+    codigos = np.array([metricas.index(m) for m, _ in colunas.values()], dtype=np.int16)
+    fatos = pd.DataFrame({
+        'metrica': pd.Categorical.from_codes(np.repeat(codigos, n), metricas),
+        'ano': np.repeat(np.array([a for _, a in colunas.values()], dtype=np.int16), n),
+    })
+    for dim in dims:
+        if dim not in df.columns: continue
+        cat = pd.Categorical(df[dim])
+        fatos[dim] = pd.Categorical.from_codes(np.tile(cat.codes, k), cat.categories)
+    valores = [df[c].to_numpy(dtype='float64', na_value=np.nan) for c in colunas]
+    fatos['valor'] = np.concatenate(valores) if valores else np.empty(0)
+    return fatos[fatos['valor'].notna().to_numpy()].reset_index(drop=True)
+
+
+def build_facts(df, colunas, dims=DIMENSOES):
+    """Soma (`valor`) e contagem (`n`) de cada coluna por ano, por (métrica, ano, Mes, Loja).
+
+    Um groupby só sobre as colunas largas de `df` (como o cubo, union/cube.py);
+    depois `melt_years` no resultado, que tem uma linha por Mês × Loja. Somas
+    servem às métricas aditivas; percentuais viram média com `valor / n` (ver
+    `yearly`). Células NaN (vazias no CSV, ou coluna que falta num dos
+    arquivos) não entram nem na soma nem na contagem. Linhas sem Mes/Loja
+    entram com a dimensão nula.
+    """
+    dims = [d for d in dims if d in df.columns]
+    valores = df[list(colunas)].astype('float64')
+    if dims:
+        grupos = valores.groupby([df[d] for d in dims], dropna=False, observed=True, sort=True)
+        largo = grupos.sum(min_count=1).reset_index()
+        contagens = grupos.count()
+    else:
+        largo = valores.sum(min_count=1).to_frame().T
+        contagens = valores.count().to_frame().T
+    # Soma NaN = Mês × Loja sem nenhuma célula preenchida: `melt_years` a deixa de
+    # fora, e as contagens (mesma ordem, coluna a coluna) perdem os mesmos zeros
+    fatos = melt_years(largo, colunas, dims)
+    n = contagens.to_numpy(dtype=np.int32).T.ravel()
+    fatos['n'] = n[n > 0]
+    return fatos
+
+
+def yearly(fatos, metricas=None, mes='Todos', loja='Todas', por=None):
+    """Valor de cada métrica por ano, numa agregação só.
+
+    Linhas: métrica (e `por`, ex.: 'Mes' para a tendência mensal); colunas: anos.
+    Métricas percentuais são a média das células; as demais, a soma.
+    """
+    mask = np.ones(len(fatos), dtype=bool)
+    if mes != 'Todos': mask &= (fatos['Mes'] == mes).to_numpy()
+    if loja != 'Todas': mask &= (fatos['Loja'] == loja).to_numpy()
+    if metricas is not None: mask &= fatos['metrica'].isin(metricas).to_numpy()
+
+    chaves = ['metrica', *([por] if por else []), 'ano']
+    g = fatos[mask].groupby(chaves, observed=True, sort=True)[['valor', 'n']].sum()
+    media = g.index.get_level_values('metrica').map(metric_type) == 'percentual'
+    valores = np.where(media, g['valor'] / g['n'].where(g['n'] > 0), g['valor'])
+    return pd.Series(valores, index=g.index).unstack('ano')
+
+
+def year_cube(fatos, dims=DIMENSOES):
+    """Fatos em formato largo: uma linha por Mês × Loja, colunas (campo, métrica, ano).
+
+    Montado uma vez na carga, como o cubo da base (union/cube.py): o filtro da
+    sidebar vira uma fatia (`slice_cube`) e `year_totals` só soma as linhas
+    dela, sem o groupby de `yearly` sobre a tabela longa a cada interação.
+    """
+    chaves = [d for d in dims if d in fatos.columns]
+    g = fatos.groupby([*chaves, 'metrica', 'ano'], dropna=False, observed=True, sort=True)[['valor', 'n']].sum()
+    if not chaves:
+        return g.stack().reorder_levels([2, 0, 1]).to_frame().T
+    return g.unstack(['metrica', 'ano'], fill_value=0)
+
+
+def year_totals(fatia):
+    """{(métrica, ano): valor} de uma fatia de `year_cube`, como em `yearly`.
+
+    Métricas percentuais são a média das células; as demais, a soma. Pares
+    sem nenhuma célula na fatia ficam de fora.
+    """
+    somas = dict(zip(fatia.columns, fatia.to_numpy(dtype='float64').sum(axis=0)))
+    totais = {}
+    for campo, metrica, ano in fatia.columns:
+        n = somas[('n', metrica, ano)]
+        if campo != 'valor' or n == 0: continue
+        valor = somas[(campo, metrica, ano)]
+        totais[(metrica, ano)] = valor / n if metric_type(metrica) == 'percentual' else valor
+    return totais
+
+
+def yoy(tabela):
+    """Variação de cada ano sobre o anterior numa tabela de `yearly`.
+
+    Colunas ('delta', ano) com a diferença (pontos percentuais nas métricas
+    percentuais) e ('var_%', ano) com a variação relativa; o primeiro ano fica NaN.
+    """
+    anterior = tabela.shift(axis=1)
+    relativa = (tabela / anterior.where(anterior != 0) - 1) * 100
+    return pd.concat({'delta': tabela - anterior, 'var_%': relativa}, axis=1)
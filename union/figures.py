@@ -0,0 +1,201 @@
+"""Gráficos Plotly do dashboard e o cache de figuras já serializadas.
+
+Cada `*_figure` recebe só os dados de que precisa e devolve um `go.Figure`, para
+poder ser chamado tanto pelo app quanto fora do Streamlit. `FigureCache`
+guarda o JSON das figuras por chave (gráfico, filtros relevantes, versão dos
+dados): uma figura só é refeita quando as entradas dela mudam.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+from union.filters import mes_sort_key
+from union.hierarchy import level_rows, subtree
+from union.instrument import mark
+
+# --- CORES ---
+COLOR_BLUE = "#0047AB"
+COLOR_GREEN = "#00A859"
+COLOR_ALERT = "#EF4444"
+COLOR_TEXT = "#1F2937"
+COLOR_GRADIENT = ["#0047AB", "#006494", "#00817D", "#009C65", "#00A859"]
+
+FIG_CACHE_MB = int(os.environ.get('UNION_FIG_CACHE_MB', 64))
+
+
+def update_fig_layout(fig):
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font={'color': COLOR_TEXT, 'family': 'Roboto'},
+        margin=dict(l=10, r=10, t=30, b=10),
+        xaxis=dict(showgrid=False, zeroline=False),
+        yaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.05)', zeroline=False),
+    )
+    return fig
+
+
+def evolucao_figure(df_chart, idx_col):
+    """Barras de venda + linha de meta por `idx_col` ('Mes' ou 'Loja').
+
+    `df_chart`: Venda e Meta somadas por `idx_col` (`rollup` do backend de consultas).
+    """
+    df_chart = df_chart.copy()
+
+    if idx_col == 'Mes':
+        df_chart['sort'] = df_chart['Mes'].astype(str).apply(mes_sort_key)
+        df_chart = df_chart.sort_values('sort')
+    else:
+        df_chart = df_chart.sort_values('Venda', ascending=False)
+
+    fig = go.Figure()
+
+    # Adicionando Rótulos de Dados (R$ 1.2M)
+    fig.add_trace(go.Bar(
+        x=df_chart[idx_col], y=df_chart['Venda'],
+        name='Realizado',
+        marker_color=COLOR_BLUE,
+        opacity=0.9,
+        text=df_chart['Venda'].apply(lambda x: f"R$ {x/1e6:.1f}M" if x > 1e6 else f"R$ {x/1e3:.0f}k"),
+        textposition='auto'
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=df_chart[idx_col], y=df_chart['Meta'],
+        name='Meta',
+        mode='lines+markers',
+        line=dict(color=COLOR_GREEN, width=3),
+        marker=dict(size=6, color='white', line=dict(width=2, color=COLOR_GREEN))
+    ))
+
+    fig = update_fig_layout(fig)
+    fig.update_layout(height=320, legend=dict(orientation="h", y=1.1, x=1, xanchor='right'), margin=dict(t=40))
+    return fig
+
+
+def gauge_figure(venda, meta):
+    """Velocímetro de atingimento da meta (%)."""
+    perc = (venda / meta * 100) if meta > 0 else 0
+    perc_visual = min(perc, 999)
+    gauge_color = COLOR_GREEN if perc >= 100 else (COLOR_BLUE if perc >= 80 else COLOR_ALERT)
+
+    fig_gauge = go.Figure(go.Indicator(
+        mode="gauge+number", value=perc_visual,
+        number={'suffix': "%", 'font': {'size': 36, 'family': 'Roboto', 'color': COLOR_TEXT}},
+        gauge={
+            'axis': {'range': [0, 120]},
+            'bar': {'color': gauge_color},
+            'steps': [{'range': [0, 100], 'color': "rgba(200, 200, 200, 0.2)"}],
+            'threshold': {'line': {'color': COLOR_GREEN, 'width': 4}, 'thickness': 0.75, 'value': 100}
+        }
+    ))
+    fig_gauge = update_fig_layout(fig_gauge)
+    fig_gauge.update_layout(height=320, margin=dict(t=40, b=20))
+    return fig_gauge
+
+
+def donut_figure(df_mix, arvore=None):
+    """Top 5 departamentos (nível 1 da classificação) por venda."""
+    if arvore is not None:
+        df_depto = df_mix.iloc[level_rows(arvore, 1)]
+        if df_depto.empty: df_depto = df_mix.copy()
+    else:
+        df_depto = df_mix.copy()
+
+    df_depto = df_depto.sort_values('Venda', ascending=False).head(5)
+
+    fig_donut = px.pie(
+        df_depto, values='Venda', names='Descricao', hole=0.6,
+        color_discrete_sequence=COLOR_GRADIENT
+    )
+    fig_donut = update_fig_layout(fig_donut)
+    fig_donut.update_layout(height=320, margin=dict(t=0, b=0, l=0, r=0), showlegend=True)
+    fig_donut.update_traces(textinfo='percent+label', textposition='inside')
+    return fig_donut
+
+
+def ranking_figure(df_rank):
+    """Venda por loja (`df_rank`: Loja, Venda), barras horizontais em ordem crescente."""
+    df_rank = df_rank.sort_values('Venda', ascending=True)
+    fig_bar = px.bar(
+        df_rank, x='Venda', y='Loja', orientation='h',
+        text_auto='.2s', color_discrete_sequence=[COLOR_BLUE]
+    )
+    fig_bar = update_fig_layout(fig_bar)
+    fig_bar.update_layout(height=320, xaxis=dict(showgrid=False))
+    return fig_bar
+
+
+def treemap_figure(df_mix, arvore, nivel, raiz=None):
+    """Treemap de um nível da classificação, opcionalmente dentro do departamento `raiz`."""
+    # Só as linhas do nível (e da subárvore) escolhidos, sem varrer o mix inteiro
+    df_tree = df_mix.iloc[level_rows(arvore, nivel, raiz)]
+    df_tree = df_tree[df_tree['Venda'] > 0]
+    if df_tree.empty:
+        df_sub = df_mix if raiz is None else df_mix.iloc[subtree(arvore, raiz)]
+        df_tree = df_sub[df_sub['Venda'] > 0].nlargest(100, 'Venda')
+
+    fig_tree = px.treemap(
+        df_tree,
+        path=['Descricao'],
+        values='Venda',
+        color='Venda',
+        color_continuous_scale='Blues',
+        hover_data=['Hierarquia', 'Part']
+    )
+    fig_tree.update_traces(textinfo="label+value+percent entry")
+    fig_tree = update_fig_layout(fig_tree)
+    fig_tree.update_layout(height=600, margin=dict(t=0, l=0, r=0, b=0))
+    return fig_tree
+
+
+class FigureCache:
+    """LRU de figuras serializadas em JSON, limitado pelo total de bytes.
+
+    Compartilhado entre sessões (e threads) do mesmo servidor.
+    """
+
+    def __init__(self, max_bytes=FIG_CACHE_MB * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Figura de `key`; chama `build()` (-> go.Figure) só se ela não estiver no cache."""
+        with self._lock:
+            js = self._items.get(key)
+            if js is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        mark(cache='hit' if js is not None else 'miss')
+        if js is not None:
+            # O JSON saiu de uma figura já validada: revalidar (pio.from_json)
+            # custaria mais que montar de novo uma figura simples
+            return go.Figure(json.loads(js), _validate=False)
+
+        fig = build()
+        js = fig.to_json()
+        if len(js) <= self.max_bytes:
+            with self._lock:
+                old = self._items.pop(key, None)
+                if old is not None: self.nbytes -= len(old)
+                self._items[key] = js
+                self.nbytes += len(js)
+                while self.nbytes > self.max_bytes:
+                    _, dropped = self._items.popitem(last=False)
+                    self.nbytes -= len(dropped)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
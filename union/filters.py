@@ -0,0 +1,68 @@
+"""Dimensões categóricas e índice de posições por valor para os filtros da sidebar.
+
+As colunas de dimensão viram `category` uma vez no carregamento (menos memória
+por sessão, comparações por código). `build_filter_index` guarda, para cada
+valor, as posições das linhas que o contêm; qualquer combinação de filtros vira
+uma interseção desses vetores, sem varrer nem copiar o DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+ORDEM_MESES = ['JAN', 'FEV', 'MAR', 'ABR', 'MAI', 'JUN', 'JUL', 'AGO', 'SET', 'OUT', 'NOV', 'DEZ']
+DIMENSOES = ['Mes', 'Loja', 'REGIÃO', 'UF', 'Formato']
+
+
+def mes_sort_key(m):
+    return ORDEM_MESES.index(m.upper()) if m.upper() in ORDEM_MESES else 99
+
+
+def dimension_values(values, col):
+    """Valores distintos de uma dimensão na ordem usada pelos seletores."""
+    # Tratamento para garantir que meses sejam strings antes de ordenar
+    vals = [str(v) for v in pd.unique(values.dropna())]
+    if col == 'Mes':
+        return sorted(vals, key=mes_sort_key)
+    return sorted(vals)
+
+
+def encode_dimensions(df, dims=DIMENSOES):
+    """Converte in-place as dimensões presentes para `category`; devolve {coluna: valores}."""
+    opcoes = {}
+    for col in dims:
+        if col not in df.columns: continue
+        cats = dimension_values(df[col], col)
+        df[col] = pd.Categorical(df[col], categories=cats)
+        opcoes[col] = cats
+    return opcoes
+
+
+def build_filter_index(df, dims=DIMENSOES):
+    """{coluna: {valor: posições}} para cada dimensão categórica presente em `df`.
+
+    As posições de cada valor são fatias (views) de um único vetor ordenado.
+    """
+    index = {}
+    dtype = np.int32 if len(df) < 2 ** 31 else np.int64
+    for col in dims:
+        if col not in df.columns: continue
+        cat = pd.Categorical(df[col])
+        codes = cat.codes
+        order = np.argsort(codes, kind='stable').astype(dtype)
+        bounds = np.searchsorted(codes[order], np.arange(-1, len(cat.categories)), side='right')
+        index[col] = {v: order[bounds[i]:bounds[i + 1]] for i, v in enumerate(cat.categories)}
+    return index
+
+
+def select_rows(index, filtros):
+    """Posições das linhas que atendem a todos os `filtros` ({coluna: valor}).
+
+    Devolve None quando nenhum filtro se aplica (todas as linhas).
+    """
+    arrays = [index[c].get(v, np.empty(0, dtype=np.int32)) for c, v in filtros.items() if c in index]
+    if not arrays:
+        return None
+    arrays.sort(key=len)
+    pos = arrays[0]
+    for other in arrays[1:]:
+        pos = np.intersect1d(pos, other, assume_unique=True)
+    return pos
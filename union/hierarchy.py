@@ -0,0 +1,82 @@
+"""Índice em árvore da Classificação Mercadológica (códigos "1.10.100.001").
+
+Com as linhas em pré-ordem, a subárvore de um nó ocupa as posições
+`[i, fim[i])`: descer para um departamento, listar filhos ou somar uma
+subárvore não exige varrer o arquivo inteiro. Todos os vetores do índice
+são alinhados às posições (iloc) do DataFrame do mix.
+"""
+import numpy as np
+
+# Diferença (R$) a partir da qual a soma dos filhos "não bate" com o pai
+TOLERANCIA = 0.01
+
+
+def preorder(df, col='Hierarquia'):
+    """`df` reordenado em pré-ordem pelos segmentos do código (pais antes dos filhos)."""
+    keys = [tuple(c.split('.')) for c in df[col]]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    return df.iloc[order]
+
+
+def build_tree(df, col='Hierarquia', valor='Venda'):
+    """Índice da árvore para um `df` já em pré-ordem (ver `preorder`).
+
+    Chaves: 'pai', 'fim', 'nivel', 'por_nivel', 'posicao', 'soma_filhos',
+    'total_folhas', 'divergentes'. Um código cujo pai direto não existe fica
+    pendurado no ancestral mais próximo que existir.
+    """
+    codes = df[col].tolist()
+    n = len(codes)
+    pai = np.full(n, -1, dtype=np.int64)
+    fim = np.full(n, n, dtype=np.int64)
+    stack = []
+    for i, code in enumerate(codes):
+        while stack and not code.startswith(codes[stack[-1]] + '.'):
+            fim[stack.pop()] = i
+        if stack: pai[i] = stack[-1]
+        stack.append(i)
+
+    nivel = df['Nivel'].to_numpy() if 'Nivel' in df.columns else np.array([c.count('.') + 1 for c in codes])
+    por_nivel = {int(k): np.flatnonzero(nivel == k) for k in np.unique(nivel)}
+
+    venda = df[valor].to_numpy(dtype='float64') if valor in df.columns else np.zeros(n)
+    tem_pai = pai >= 0
+    soma_filhos = np.bincount(pai[tem_pai], weights=venda[tem_pai], minlength=n)
+    n_filhos = np.bincount(pai[tem_pai], minlength=n)
+    folha = n_filhos == 0
+    # Soma das folhas de qualquer subárvore em O(1): acumulado das folhas em pré-ordem
+    acum = np.concatenate([[0.0], np.cumsum(np.where(folha, venda, 0.0))])
+    total_folhas = acum[fim] - acum[np.arange(n)]
+    divergentes = np.flatnonzero(~folha & (np.abs(soma_filhos - venda) > TOLERANCIA))
+
+    return {
+        'pai': pai, 'fim': fim, 'nivel': nivel, 'por_nivel': por_nivel,
+        'posicao': {c: i for i, c in enumerate(codes)},
+        'soma_filhos': soma_filhos, 'total_folhas': total_folhas,
+        'divergentes': divergentes,
+    }
+
+
+def subtree(arvore, i):
+    """Fatia de posições da subárvore de `i` (o próprio nó incluso)."""
+    return slice(i, int(arvore['fim'][i]))
+
+
+def children(arvore, i):
+    """Posições dos filhos diretos de `i`, saltando de subárvore em subárvore."""
+    fim = arvore['fim']
+    out = []
+    c, stop = i + 1, fim[i]
+    while c < stop:
+        out.append(c)
+        c = fim[c]
+    return np.array(out, dtype=np.int64)
+
+
+def level_rows(arvore, nivel, raiz=None):
+    """Posições dos nós do `nivel`, opcionalmente só dentro da subárvore de `raiz`."""
+    pos = arvore['por_nivel'].get(nivel, np.empty(0, dtype=np.int64))
+    if raiz is None:
+        return pos
+    lo, hi = np.searchsorted(pos, [raiz, arvore['fim'][raiz]])
+    return pos[lo:hi]
@@ -0,0 +1,592 @@
+"""Leitura e limpeza dos CSVs do cliente (base geral e classificação mercadológica)."""
+import csv
+import glob
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from union.cache import cache_entry, cached_file, cached_frame, cached_growing_frame, read_entry, write_entry
+from union.cube import build_cube, build_cube_index
+from union.facts import METRICAS_FATOS, build_facts, metric_type, split_year, year_columns, year_cube
+from union.filters import encode_dimensions
+from union.hierarchy import build_tree, preorder
+from union.instrument import mark, stage
+from union.parsing import BR_PARSERS, clean_columns
+from union.query import make_backend
+from union.sniff import cached_sniff, match_columns, remember
+
+# Nome que o dashboard usa <- trecho procurado no cabeçalho do CSV
+COL_MAP = {
+    'Venda 2022 R$': 'Venda', 'Meta Venda 2022': 'Meta',
+    'Margem Bruta 2022 %': 'Margem_Perc', 'Qtd de cupom 2022': 'Clientes',
+    'NOME LOJA': 'Loja', 'MÊS': 'Mes'
+}
+# Colunas por ano de COL_MAP pelo nome que ganham na base: {'Venda': ('Venda', 2022), ...}
+MAPPED_YEARS = {nome: ano for c, nome in COL_MAP.items() if (ano := split_year(c))}
+# Ano das colunas de COL_MAP: o dos números dos cartões de KPI
+BASE_YEAR = max(ano for _, ano in MAPPED_YEARS.values())
+CLASS_MAP = {
+    'Classificação': 'Hierarquia', 'Grupo': 'Descricao',
+    'Valor': 'Venda', '% Partic': 'Part', '% Lucro': 'Lucro'
+}
+BASE_TYPES = {
+    'Venda': 'moeda', 'Meta': 'moeda',
+    'Clientes': 'inteiro', 'Margem_Perc': 'percentual'
+}
+# % Lucro chega com ponto de milhar (ex: -2.924,13), que o 'percentual' não entende
+MIX_TYPES = {'Venda': 'moeda', 'Part': 'percentual', 'Lucro': 'percentual_milhar'}
+
+# Mude sempre que a leitura/limpeza mudar de resultado: invalida o cache em disco
+PIPELINE_VERSION = 8
+
+# Leitura em blocos (memória constante) para bases a partir deste tamanho
+STREAM_MIN_BYTES = int(os.environ.get('UNION_STREAM_MB', 256)) * 2 ** 20
+CHUNK_ROWS = int(os.environ.get('UNION_CHUNK_ROWS', 100_000))
+_TAIL_BLOCK = 64 * 1024
+
+# Plano de leitura da base: só as colunas de COL_MAP, as colunas por ano (para a
+# tabela de fatos, ver union/facts.py) e as extras são lidas do CSV.
+# Extras: "Coluna" (dimensão, vira `category`) ou "Coluna:tipo" (tipo de BR_PARSERS),
+# separadas por vírgula em UNION_EXTRA_COLUMNS.
+EXTRA_COLUMNS = os.environ.get('UNION_EXTRA_COLUMNS', 'REGIÃO,UF,Formato')
+# Tipo em memória de cada tipo BR depois da limpeza. Moeda continua float64:
+# float32 guarda ~7 dígitos e perderia os centavos a partir de R$ 100 mil.
+COMPACT_DTYPES = {'moeda': 'float64', 'percentual': 'float32', 'percentual_milhar': 'float32',
+                  'inteiro': 'int32'}
+# Colunas só dos fatos por ano guardam célula vazia como NaN: inteiros viram float
+NULLABLE_DTYPES = {'moeda': 'float64', 'percentual': 'float32', 'percentual_milhar': 'float32',
+                   'inteiro': 'float64'}
+
+# Modo multiarquivo: um CSV por loja/mês dentro de UNION_BASE_DIR (subpastas inclusas)
+BASE_DIR = os.environ.get('UNION_BASE_DIR') or None
+WORKERS = int(os.environ.get('UNION_WORKERS', 0)) or os.cpu_count() or 1
+
+
+def find_sources(pasta='.'):
+    """(base_file, class_file) encontrados em `pasta`; None quando não existe."""
+    files = [f for f in os.listdir(pasta) if f.endswith('.csv') or f.endswith('.CSV')]
+    base_file = next((f for f in files if 'base' in f.lower() or 'dados' in f.lower()), None)
+    class_file = next((f for f in files if 'classificacao' in f.lower()), None)
+    join = lambda f: os.path.join(pasta, f) if f else None
+    return join(base_file), join(class_file)
+
+
+def sniff(path, mapping, pasta=None):
+    """Encoding, separador, cabeçalho e colunas de `path` (ver union/sniff.py)."""
+    return cached_sniff(path, mapping, pasta or os.path.dirname(path) or '.')
+
+
+def read_csv_conf(source, conf, **kwargs):
+    """pd.read_csv com a configuração farejada, numa única passada.
+
+    Se o arquivo deixa de ser utf-8 depois da amostra, relê como latin1 e
+    corrige a configuração gravada.
+    """
+    kwargs = {'sep': conf['sep'], 'header': conf['header'], 'on_bad_lines': 'skip', **kwargs}
+    try:
+        return pd.read_csv(source, encoding=conf['encoding'], **kwargs)
+    except UnicodeDecodeError:
+        if conf['encoding'] == 'latin1': raise
+        if hasattr(source, 'seek'): source.seek(0)
+        _fix_encoding(conf)
+        return pd.read_csv(source, encoding='latin1', **kwargs)
+
+
+def _fix_encoding(conf):
+    conf['encoding'] = 'latin1'
+    if '_cache' in conf: remember(conf['_cache'], conf)
+
+
+def _read_csv_str(source, conf, **kwargs):
+    # Lê tudo como string (dtype=str) para evitar que o Pandas converta "1.000" em 1.0 automaticamente
+    return read_csv_conf(source, conf, dtype=str, **kwargs)
+
+
+def parse_extras(spec=EXTRA_COLUMNS):
+    """"REGIÃO,CMV 2022 R$:moeda" -> {'REGIÃO': None, 'CMV 2022 R$': 'moeda'}."""
+    extras = {}
+    for item in spec.split(','):
+        nome, _, tipo = item.strip().partition(':')
+        if not nome: continue
+        if tipo and tipo not in BR_PARSERS:
+            raise ValueError(f"tipo desconhecido em UNION_EXTRA_COLUMNS: {item!r}")
+        extras[nome.strip()] = tipo or None
+    return extras
+
+
+def read_plan(conf, extras=EXTRA_COLUMNS):
+    """O que ler da base farejada em `conf`.
+
+    {'usecols': nomes no arquivo (sem espaços nas pontas), 'columns': nomes
+    finais, na ordem do arquivo, 'types': {nome final: tipo BR}, 'nullable':
+    colunas em que célula vazia fica NaN}. Colunas com ano no nome fora de
+    COL_MAP entram com o próprio nome e o tipo da métrica (`metric_type`),
+    para os fatos por ano saírem da mesma leitura; vazias nelas ficam fora dos
+    fatos em vez de virar 0. Só as das métricas de METRICAS_FATOS: as outras
+    (CMV, Estoques...) nenhuma tela usa e triplicariam o tempo de leitura.
+    Extras que não existem no arquivo são ignoradas.
+    """
+    extras = parse_extras(extras) if isinstance(extras, str) else dict(extras)
+    anos = {c: v for c, v in year_columns(conf['columns']).items()
+            if c not in conf['mapping'] and v[0] in METRICAS_FATOS}
+    nomes = {**{c: c for c in anos}, **conf['mapping'], **{c: c for c in conf['columns'] if c in extras}}
+    usecols = [c for c in conf['columns'] if c in nomes]
+    types = dict(BASE_TYPES)
+    types.update({c: metric_type(m) for c, (m, _) in anos.items()})
+    types.update({c: t for c, t in extras.items() if t})
+    return {'usecols': usecols, 'columns': [nomes[c] for c in usecols], 'types': types,
+            'nullable': [c for c in anos if c not in extras]}
+
+
+def _usecols(plan):
+    # Função em vez de lista: casa com o cabeçalho bruto do arquivo (com espaços)
+    wanted = set(plan['usecols'])
+    return lambda c: str(c).strip() in wanted
+
+
+def clean_base(df_base, types=BASE_TYPES, nullable=()):
+    """Padroniza nomes e converte os números da base -> (DataFrame, falhas).
+
+    Nas colunas de `nullable`, células vazias viram NaN em vez de 0.
+    """
+    df_base.columns = df_base.columns.str.strip()
+    df_base = df_base.rename(columns=match_columns(df_base.columns, COL_MAP))
+    vazias = {c: (df_base[c].isna() | df_base[c].str.strip().eq('')).to_numpy()
+              for c in nullable if c in df_base.columns}
+
+    # Aplica limpezas específicas (coluna inteira de uma vez, ver union/parsing.py)
+    falhas = clean_columns(df_base, types)
+    for c, mask in vazias.items():
+        df_base[c] = df_base[c].astype('float64').mask(mask)
+    return df_base, falhas
+
+
+def read_base(base_file, chunksize=None, progresso=None, conf=None, extras=EXTRA_COLUMNS):
+    """Base geral limpa e compacta -> (DataFrame, {coluna: células que falharam}).
+
+    Só as colunas do plano de leitura (`read_plan`) saem do parser de CSV; a
+    base larga (~40 colunas de texto) nunca é montada. Com `chunksize`, lê em
+    blocos (ver `stream_base`). `conf` é o resultado de `sniff` (farejado se omitido).
+    """
+    conf = conf or sniff(base_file, COL_MAP)
+    if chunksize:
+        return stream_base(base_file, 0, chunksize, progresso, conf, extras)
+    plan = read_plan(conf, extras)
+    df_base, falhas = clean_base(_read_csv_str(base_file, conf, usecols=_usecols(plan)),
+                                 plan['types'], plan['nullable'])
+    return _compact(df_base, plan), falhas
+
+
+def read_base_tail(base_file, offset, chunksize=None, progresso=None, extras=EXTRA_COLUMNS):
+    """Só as linhas a partir do byte `offset` (início de linha) da base, já limpas."""
+    conf = sniff(base_file, COL_MAP)
+    if chunksize:
+        return stream_base(base_file, offset, chunksize, progresso, conf, extras)
+    plan = read_plan(conf, extras)
+    with open(base_file, 'rb') as f:
+        f.seek(offset)
+        tail = io.BytesIO(_header_line(conf, conf['encoding']) + f.read())
+    df_tail = _read_csv_str(tail, conf, header=0, usecols=_usecols(plan))
+    df_tail, falhas = clean_base(df_tail, plan['types'], plan['nullable'])
+    return _compact(df_tail, plan), falhas
+
+
+def stream_base(base_file, offset=0, chunksize=CHUNK_ROWS, progresso=None, conf=None,
+                extras=EXTRA_COLUMNS):
+    """Lê a base a partir de `offset` em blocos de `chunksize` linhas.
+
+    Cada bloco é limpo e compactado (ver `_compact`) antes do próximo ser lido:
+    o pico de memória depende do tamanho do bloco, não do arquivo.
+    `progresso(bytes_lidos, total)` é chamado a cada bloco.
+    """
+    conf = conf or sniff(base_file, COL_MAP)
+    plan = read_plan(conf, extras)
+    total = os.path.getsize(base_file)
+    for encoding in dict.fromkeys([conf['encoding'], 'latin1']):
+        partes, falhas = [], {}
+        try:
+            with open(base_file, 'rb') as f:
+                f.seek(offset)
+                source, skip = f, conf['header']
+                if offset:
+                    source = io.BufferedReader(_Prefixed(_header_line(conf, encoding), f))
+                    skip = 0
+                reader = pd.read_csv(source, encoding=encoding, sep=conf['sep'], header=skip,
+                                     on_bad_lines='skip', dtype=str, usecols=_usecols(plan),
+                                     chunksize=chunksize)
+                for chunk in reader:
+                    df_chunk, falhas_chunk = clean_base(chunk, plan['types'], plan['nullable'])
+                    partes.append(_compact(df_chunk, plan))
+                    falhas = _merge_falhas(falhas, falhas_chunk)
+                    if progresso: progresso(f.tell(), total)
+            break
+        except UnicodeDecodeError:
+            if encoding == 'latin1': raise
+            _fix_encoding(conf)
+    if not partes:
+        vazio = pd.DataFrame(columns=plan['usecols'], dtype=str)
+        return _compact(clean_base(vazio, plan['types'], plan['nullable'])[0], plan), falhas
+    return concat_frames(partes), falhas
+
+
+def _header_line(conf, encoding):
+    # A cauda é lida com um cabeçalho sintético na frente, como se fosse um
+    # arquivo inteiro: `usecols` com `names` falha quando a cauda é uma linha curta
+    out = io.StringIO()
+    csv.writer(out, delimiter=conf['sep'], lineterminator='\n').writerow(conf['columns'])
+    return out.getvalue().encode(encoding)
+
+
+class _Prefixed(io.RawIOBase):
+    """`f` (já posicionado) lido como se começasse pelos bytes de `prefixo`."""
+
+    def __init__(self, prefixo, f):
+        self.prefixo, self.f = prefixo, f
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self.prefixo:
+            n = min(len(b), len(self.prefixo))
+            b[:n] = self.prefixo[:n]
+            self.prefixo = self.prefixo[n:]
+            return n
+        return self.f.readinto(b)
+
+
+def _compact(df, plan):
+    """Só as colunas do plano: medidas no tipo de COMPACT_DTYPES, o resto `category`."""
+    cols = [c for c in plan['columns'] if c in df.columns]
+    df = df[cols].copy()
+    for col in cols:
+        tipo = plan['types'].get(col)
+        if tipo is None:
+            df[col] = df[col].astype('category')
+        elif col in plan.get('nullable', ()):
+            df[col] = df[col].astype(NULLABLE_DTYPES[tipo])
+        elif tipo == 'inteiro' and len(df) and not (-2 ** 31 <= df[col].min() and df[col].max() < 2 ** 31):
+            continue    # não cabe em int32: fica int64
+        else:
+            df[col] = df[col].astype(COMPACT_DTYPES[tipo])
+    return df
+
+
+def concat_frames(frames):
+    """pd.concat que mantém as colunas `category` como categóricas (une os valores)."""
+    df = pd.concat(frames, ignore_index=True)
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype) and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = union_categoricals([f[col] for f in frames])
+    return df
+
+
+def _merge_falhas(a, b):
+    falhas = dict(a)
+    for col, n in b.items():
+        falhas[col] = falhas.get(col, 0) + n
+    return falhas
+
+
+def _drop_falhas(a, b):
+    falhas = dict(a)
+    for col, n in b.items():
+        falhas[col] = falhas.get(col, 0) - n
+    return {col: n for col, n in falhas.items() if n > 0}
+
+
+def _partial_falhas(base_file):
+    """Falhas só da última linha, se ela ainda não terminou (gravação em andamento)."""
+    with open(base_file, 'rb') as f:
+        fim = pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            pos = max(0, pos - _TAIL_BLOCK)
+            f.seek(pos)
+            bloco = f.read(fim - pos if pos + _TAIL_BLOCK >= fim else _TAIL_BLOCK)
+            if pos + len(bloco) == fim and bloco.endswith(b'\n'): return {}
+            nl = bloco.rfind(b'\n')
+            if nl >= 0:
+                return read_base_tail(base_file, pos + nl + 1)[1]
+    return {}    # arquivo de uma linha só: é o cabeçalho
+
+
+def _base_meta(base_file, falhas):
+    # A linha parcial entra no df (e nas falhas), mas é relida com a próxima cauda:
+    # guarda as falhas dela para descontar antes de reler
+    return {'falhas': falhas, 'falhas_parcial': _partial_falhas(base_file)}
+
+
+def build_base(base_file, chunksize=None, progresso=None):
+    """Leitura completa da base para o cache -> (DataFrame, meta)."""
+    df_base, falhas = read_base(base_file, chunksize, progresso)
+    return df_base, _base_meta(base_file, falhas)
+
+
+def extend_base(base_file, df_base, meta, offset, chunksize=None, progresso=None):
+    """Acrescenta ao `df_base` em cache as linhas novas depois de `offset`."""
+    df_tail, falhas_tail = read_base_tail(base_file, offset, chunksize, progresso)
+    df_base = concat_frames([df_base, df_tail])
+    falhas = _drop_falhas(meta.get('falhas', {}), meta.get('falhas_parcial', {}))
+    return df_base, _base_meta(base_file, _merge_falhas(falhas, falhas_tail))
+
+
+def find_base_files(base_dir):
+    """Todos os CSVs dentro de `base_dir` (recursivo), em ordem de caminho."""
+    paths = glob.glob(os.path.join(base_dir, '**', '*'), recursive=True)
+    return sorted(p for p in paths if (p.endswith('.csv') or p.endswith('.CSV')) and os.path.isfile(p))
+
+
+def read_base_file(path, cache_pasta='.'):
+    """Um arquivo do modo multiarquivo -> (df compacto ou None, falhas, colunas de COL_MAP faltando).
+
+    Roda dentro dos processos do pool: só recebe e devolve objetos serializáveis.
+    """
+    conf = sniff(path, COL_MAP, cache_pasta)
+    achadas = set(conf['mapping'].values())
+    faltando = [c for c in COL_MAP.values() if c not in achadas]
+    if faltando:
+        return None, {}, faltando
+    chunksize = CHUNK_ROWS if os.path.getsize(path) >= STREAM_MIN_BYTES else None
+    df, falhas = read_base(path, chunksize, conf=conf)
+    return df, falhas, []
+
+
+def read_base_dir(base_dir, workers=WORKERS, use_cache=True, progresso=None, cache_pasta='.'):
+    """Junta todos os CSVs de `base_dir` num único DataFrame compacto.
+
+    Arquivos sem cache válido são lidos em paralelo num pool de processos; cada
+    arquivo tem seu próprio cache em disco, então um mês novo não relê os antigos.
+    Devolve (df ou None, falhas, {arquivo: motivo}) com os arquivos ignorados por
+    não casarem com COL_MAP ou por erro de leitura.
+    """
+    files = find_base_files(base_dir)
+    version = f"{PIPELINE_VERSION}-{EXTRA_COLUMNS}"
+    total = sum(os.path.getsize(p) for p in files)
+    lidos = 0
+    frames, falhas, rejeitados = {}, {}, {}
+    entries = {}
+
+    def done(path, df, falhas_arq, faltando):
+        nonlocal lidos, falhas
+        if faltando:
+            rejeitados[path] = "colunas não encontradas: " + ", ".join(faltando)
+        else:
+            frames[path] = df
+            falhas = _merge_falhas(falhas, falhas_arq)
+        lidos += os.path.getsize(path)
+        if progresso: progresso(lidos, total)
+
+    pending = []
+    for path in files:
+        hit = None
+        if use_cache:
+            entries[path] = cache_entry(_file_cache_name(path), [path], version, cache_pasta)
+            hit = read_entry(entries[path])
+        if hit is not None:
+            done(path, hit[0], hit[1].get('falhas', {}), [])
+        else:
+            pending.append(path)
+    mark(cache=f"{len(files) - len(pending)}/{len(files)} arquivos do cache")
+
+    def finish(path, result):
+        df, falhas_arq, faltando = result
+        if df is not None and use_cache:
+            write_entry(entries[path], df, {'falhas': falhas_arq})
+        done(path, df, falhas_arq, faltando)
+
+    if len(pending) > 1 and workers > 1:
+        # 'spawn': o servidor do Streamlit tem threads, não é seguro fazer fork dele
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=ctx) as pool:
+            futures = {pool.submit(read_base_file, p, cache_pasta): p for p in pending}
+            for fut in as_completed(futures):
+                path = futures[fut]
+                try:
+                    finish(path, fut.result())
+                except Exception as e:
+                    rejeitados[path] = f"erro de leitura: {e}"
+    else:
+        for path in pending:
+            try:
+                finish(path, read_base_file(path, cache_pasta))
+            except Exception as e:
+                rejeitados[path] = f"erro de leitura: {e}"
+
+    if not frames:
+        return None, falhas, rejeitados
+    return concat_frames([frames[p] for p in files if p in frames]), falhas, rejeitados
+
+
+def _file_cache_name(path):
+    return "arq-" + hashlib.blake2b(os.path.abspath(path).encode(), digest_size=8).hexdigest()
+
+
+def fact_columns(columns):
+    """{coluna da base: (métrica, ano)} das colunas por ano (as de COL_MAP já renomeadas)."""
+    achadas = {c: MAPPED_YEARS.get(c) or split_year(str(c)) for c in columns}
+    return {c: v for c, v in achadas.items() if v}
+
+
+def split_facts(df_base, extras=EXTRA_COLUMNS):
+    """(fatos por ano, base sem as colunas que só servem aos fatos).
+
+    As colunas por ano vêm da mesma leitura da base (ver `read_plan`): aqui só
+    são reduzidas por Mês × Loja (`build_facts`), sem reler o CSV. As de
+    COL_MAP e as extras continuam na base; as demais saem da memória.
+    """
+    extras = parse_extras(extras) if isinstance(extras, str) else dict(extras)
+    anos = fact_columns(df_base.columns)
+    fatos = build_facts(df_base, anos)
+    so_fatos = [c for c in anos if c not in MAPPED_YEARS and c not in extras]
+    return fatos, df_base.drop(columns=so_fatos)
+
+
+def read_mix(class_file):
+    """Classificação mercadológica limpa -> (DataFrame, {coluna: células que falharam})."""
+    # O relatório do ERP pode ter uma linha de título antes do cabeçalho: o sniff acha a linha certa
+    df_class = read_csv_conf(class_file, sniff(class_file, CLASS_MAP))
+
+    df_class.columns = df_class.columns.str.strip()
+    df_class = df_class.rename(columns=match_columns(df_class.columns, CLASS_MAP))
+
+    falhas = clean_columns(df_class, MIX_TYPES)
+    if 'Hierarquia' in df_class.columns:
+        df_class = df_class.dropna(subset=['Hierarquia'])
+        df_class['Hierarquia'] = df_class['Hierarquia'].astype(str)
+        df_class['Nivel'] = df_class['Hierarquia'].str.count(r'\.').astype('int64') + 1
+        # Pré-ordem: a subárvore de cada nó fica contígua (ver union/hierarchy.py)
+        df_class = preorder(df_class)
+    return df_class, falhas
+
+
+def load_datasets(pasta='.', use_cache=True, chunksize=None, progresso=None, base_dir=BASE_DIR):
+    """Carrega 'base' e 'mix' de `pasta`, passando pelo cache colunar em disco.
+
+    A base é lida em blocos de `chunksize` linhas quando informado ou, por
+    padrão, quando passa de STREAM_MIN_BYTES. Com `base_dir` (UNION_BASE_DIR)
+    ela vem de todos os CSVs dessa pasta (ver `read_base_dir`).
+    `progresso(bytes_lidos, total)` acompanha a leitura da base.
+
+    Devolve {'base', 'opcoes', 'cubo', 'cubo_idx', 'base_arquivos', 'consultas',
+    'fatos', 'fatos_cubo', 'fatos_idx', 'mix', 'arvore', 'falhas', 'erros',
+    'rejeitados'}; datasets ausentes ou com erro simplesmente não aparecem no
+    dicionário. As dimensões da base já vêm como `category`, `opcoes` traz os
+    valores de cada seletor, `consultas` é o backend das abas (ver
+    union/query.py) e `fatos` a tabela longa de todas as métricas do dashboard
+    por ano (ver union/facts.py), lida junto com a base; `fatos_cubo` é a
+    mesma tabela larga por Mês × Loja (`year_cube`), para os cartões.
+    """
+    datasets = {}
+    # Células não vazias que não viraram número (continuam como 0)
+    falhas = {}
+    erros = {}
+    datasets['falhas'] = falhas
+    datasets['erros'] = erros
+
+    # 1. BASE GERAL
+    arquivos = []
+    try:
+        base_file, class_file = find_sources(pasta)
+        with stage('base: leitura') as info:
+            if base_dir:
+                df_base, falhas['base'], datasets['rejeitados'] = read_base_dir(
+                    base_dir, use_cache=use_cache, progresso=progresso, cache_pasta=pasta)
+                if df_base is not None:
+                    datasets['base'] = df_base
+                if use_cache:
+                    arquivos = [cached_file(_file_cache_name(p), pasta) for p in find_base_files(base_dir)]
+            elif base_file:
+                if chunksize is None and os.path.getsize(base_file) >= STREAM_MIN_BYTES:
+                    chunksize = CHUNK_ROWS
+                datasets['base'], falhas['base'] = _load_base(base_file, use_cache, chunksize, progresso)
+                if use_cache:
+                    arquivos = [cached_file('base', os.path.dirname(base_file) or '.')]
+            info['linhas'] = len(datasets.get('base', ()))
+        if 'base' in datasets:
+            with stage('base: opções dos filtros'):
+                datasets['opcoes'] = encode_dimensions(datasets['base'])
+            # 1b. MÉTRICAS POR ANO (colunas "... 2021", "... 2022" das métricas do dashboard)
+            try:
+                with stage('fatos por ano') as info:
+                    datasets['fatos'], datasets['base'] = split_facts(datasets['base'])
+                    info['linhas'] = len(datasets['fatos'])
+                    # Largo por Mês × Loja: os cartões só somam a fatia do filtro
+                    datasets['fatos_cubo'] = year_cube(datasets['fatos'])
+                    datasets['fatos_idx'] = build_cube_index(datasets['fatos_cubo'])
+            except Exception as e:
+                erros['fatos'] = str(e)
+            with stage('base: cubo') as info:
+                datasets['cubo'] = build_cube(datasets['base'])
+                datasets['cubo_idx'] = build_cube_index(datasets['cubo'])
+                info['linhas'] = len(datasets['cubo'])
+            with stage('base: backend de consultas') as info:
+                # Arquivos Arrow do cache com a base: o backend DuckDB consulta direto deles
+                datasets['base_arquivos'] = [a for a in arquivos if a]
+                datasets['consultas'] = make_backend(datasets)
+                info['backend'] = datasets['consultas'].nome
+    except Exception as e:
+        erros['base'] = str(e)
+        # Sem o backend as abas não têm de onde consultar: a base sai inteira
+        for nome in ('base', 'opcoes', 'fatos', 'fatos_cubo', 'fatos_idx', 'cubo', 'cubo_idx',
+                     'base_arquivos', 'consultas'):
+            datasets.pop(nome, None)
+
+    # 2. CLASSIFICAÇÃO MERCADOLÓGICA
+    try:
+        if class_file:
+            with stage('mix: leitura') as info:
+                datasets['mix'], falhas['mix'] = _load(
+                    'mix', class_file, read_mix, use_cache)
+                info['linhas'] = len(datasets['mix'])
+            if 'Hierarquia' in datasets['mix'].columns:
+                with stage('mix: árvore'):
+                    datasets['arvore'] = build_tree(datasets['mix'])
+    except Exception as e:
+        erros['mix'] = str(e)
+
+    return datasets
+
+
+def _load_base(base_file, use_cache, chunksize=None, progresso=None):
+    # A base do ERP só cresce no fim: o cache reaproveita o que já foi ingerido
+    if not use_cache:
+        return read_base(base_file, chunksize, progresso)
+    # As extras entram na versão: mudar UNION_EXTRA_COLUMNS refaz o cache
+    version = f"{PIPELINE_VERSION}-{EXTRA_COLUMNS}"
+    df, meta = cached_growing_frame(
+        'base', base_file,
+        build=lambda: build_base(base_file, chunksize, progresso),
+        extend=lambda df, meta, offset: extend_base(base_file, df, meta, offset, chunksize, progresso),
+        version=version, pasta=os.path.dirname(base_file) or '.')
+    return df, meta.get('falhas', {})
+
+
+def source_signature(pasta='.', base_dir=BASE_DIR):
+    """(nome, tamanho, mtime) dos CSVs de `pasta` (e de `base_dir`): muda quando algum arquivo muda."""
+    paths = [os.path.join(pasta, f) for f in sorted(os.listdir(pasta))
+             if f.endswith('.csv') or f.endswith('.CSV')]
+    if base_dir:
+        paths += find_base_files(base_dir)
+    sig = []
+    for p in paths:
+        st = os.stat(p)
+        sig.append((p, st.st_size, st.st_mtime_ns))
+    return tuple(sig)
+
+
+def _load(name, path, reader, use_cache):
+    if not use_cache:
+        return reader(path)
+    df, meta = cached_frame(name, [path], lambda: _with_meta(reader(path)),
+                            version=PIPELINE_VERSION, pasta=os.path.dirname(path) or '.')
+    return df, meta.get('falhas', {})
+
+
+def _with_meta(result):
+    df, falhas = result
+    return df, {'falhas': falhas}
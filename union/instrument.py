@@ -0,0 +1,185 @@
+"""Tempo, linhas, cache e memória de cada etapa do carregamento e das abas.
+
+Uso:
+
+    with tracing('rerun'):                 # um registro por execução
+        with stage('cubo') as info:        # uma etapa
+            cubo = build_cube(df)
+            info['linhas'] = len(cubo)
+
+`tracing` ativa um `Trace` na thread atual (o Streamlit roda cada sessão na
+sua thread); dentro de outro `tracing` ele só reaproveita o de fora. `stage`
+sem trace ativo não mede nada. O código de cache chama `mark(cache='hit')`
+para anotar a etapa em andamento. Com UNION_TIMING_LOG (caminho de um
+arquivo; desligado por padrão), cada trace fechado vira uma linha JSON nele.
+A gravação sai do caminho da requisição (uma thread grava o que a sessão
+enfileira) e o arquivo gira ao passar de UNION_TIMING_LOG_MB, guardando
+TIMING_LOG_BACKUPS arquivos antigos.
+"""
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+log = logging.getLogger(__name__)
+
+# Arquivo JSONL dos traces; vazio (padrão) desliga o log
+TIMING_LOG = os.environ.get('UNION_TIMING_LOG', '')
+TIMING_LOG_MB = float(os.environ.get('UNION_TIMING_LOG_MB', 50))
+TIMING_LOG_BACKUPS = 3
+
+_local = threading.local()
+_log_lock = threading.Lock()
+# Caminho do log -> (QueueHandler que recebe as linhas, QueueListener que as grava)
+_handlers = {}
+_PAGE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_mb(pid='self'):
+    """Memória residente do processo `pid` (padrão: este), em MB; None fora do Linux."""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * _PAGE / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Trace:
+    """Etapas medidas de uma execução (rerun, fragmento ou carga dos datasets)."""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.inicio = time.time()
+        self.segundos = None
+        self.etapas = []
+        self._abertas = []
+
+    def to_record(self):
+        return {'trace': self.nome, 'inicio': self.inicio, 'segundos': self.segundos,
+                'pid': os.getpid(), 'etapas': self.etapas}
+
+
+def current():
+    return getattr(_local, 'trace', None)
+
+
+def begin(nome):
+    """Ativa um `Trace` novo nesta thread, substituindo o anterior."""
+    _local.trace = Trace(nome)
+    return _local.trace
+
+
+def end(trace, log_path=None):
+    """Fecha `trace` (duração total), grava no log e o desativa se for o atual."""
+    trace.segundos = time.time() - trace.inicio
+    if current() is trace:
+        _local.trace = None
+    write_record(trace.to_record(), log_path)
+    return trace
+
+
+@contextmanager
+def tracing(nome, log_path=None):
+    """`begin`/`end` em volta do bloco; dentro de outro trace, entra nele."""
+    if current() is not None:
+        yield current()
+        return
+    trace = begin(nome)
+    try:
+        yield trace
+    finally:
+        end(trace, log_path)
+
+
+def traced(nome):
+    """Decorador: a função inteira vira a etapa `nome`, dentro de `tracing(nome)`.
+
+    Feito para os fragmentos do Streamlit: rodando junto com o script, entram no
+    trace dele; rodando sozinhos, geram o próprio registro.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracing(nome), stage(nome):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stage(etapa, **info):
+    """Mede o bloco no trace atual: segundos, delta de RSS e o que estiver em `info`.
+
+    O bloco recebe `info` e pode completá-lo (ex.: `info['linhas'] = len(df)`).
+    O delta de memória é do processo inteiro: com sessões simultâneas, inclui as outras.
+    """
+    trace = current()
+    if trace is None:
+        yield info
+        return
+    registro = {'etapa': etapa, **info}
+    trace._abertas.append(registro)
+    rss, inicio = rss_mb(), time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro['segundos'] = time.perf_counter() - inicio
+        depois = rss_mb()
+        if rss is not None and depois is not None:
+            registro['memoria_mb'] = depois - rss
+        trace._abertas.pop()
+        trace.etapas.append(registro)
+
+
+def mark(**info):
+    """Anota `info` (ex.: cache='hit') na etapa em andamento, se houver."""
+    trace = current()
+    if trace is not None and trace._abertas:
+        trace._abertas[-1].update(info)
+
+
+def _handler(path):
+    """QueueHandler de `path`: um `QueueListener` grava as linhas com rotação."""
+    with _log_lock:
+        if path not in _handlers:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            arquivo = RotatingFileHandler(path, maxBytes=int(TIMING_LOG_MB * 2 ** 20),
+                                          backupCount=TIMING_LOG_BACKUPS, encoding='utf-8', delay=True)
+            arquivo.setFormatter(logging.Formatter('%(message)s'))
+            fila = queue.SimpleQueue()
+            listener = QueueListener(fila, arquivo)
+            listener.start()
+            _handlers[path] = (QueueHandler(fila), listener)
+        return _handlers[path][0]
+
+
+@atexit.register
+def close_timing_logs():
+    """Grava o que ainda estiver nas filas e fecha os arquivos de log."""
+    with _log_lock:
+        handlers = list(_handlers.values())
+        _handlers.clear()
+    for _, listener in handlers:
+        listener.stop()
+        for h in listener.handlers:
+            h.close()
+
+
+def write_record(record, path=None):
+    """Enfileira `record` como uma linha JSON de `path` (padrão: UNION_TIMING_LOG)."""
+    path = TIMING_LOG if path is None else path
+    if not path:
+        return
+    try:
+        handler = _handler(path)
+    except OSError as e:
+        log.warning("não foi possível gravar %s: %s", path, e)
+        return
+    linha = json.dumps(record, ensure_ascii=False, default=str)
+    handler.handle(logging.makeLogRecord({'msg': linha}))
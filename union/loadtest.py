@@ -0,0 +1,298 @@
+"""Teste de carga: sessões simultâneas num servidor Streamlit de verdade, medindo a latência dos reruns.
+
+    python -m union.loadtest --sessoes 1,4,16,32 --acoes 20
+    python -m union.loadtest --pasta /caminho/dos/csvs --json carga.json
+
+O app sobe como em produção (`python -m union.serve`, num processo à parte) e
+cada sessão simulada é um cliente websocket, como um navegador: manda o
+`rerun_script` com o estado dos widgets e lê as mensagens até o
+`script_finished`. As sessões dividem o processo do servidor, o dataset
+compartilhado (union/shared.py) e o cache de figuras. Uma sessão repete
+ações de usuário sorteadas (trocar mês, trocar loja, abrir a aba de mix e
+mexer no slider, voltar à visão executiva) e cada ação vale um rerun
+cronometrado. Exceção no script, conexão caída ou tempo esgotado contam como
+erro da sessão, nunca como latência. Para cada nível de concorrência saem
+p50/p95/p99 da latência, reruns por segundo e a memória residente do
+servidor; no fim, o maior nível com p95 abaixo de --limite segundos e sem erros.
+
+Sem --pasta, gera os dados (union/synth.py) numa pasta temporária.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import ExitStack, contextmanager
+
+import numpy as np
+
+from union.instrument import rss_mb
+from union.synth import generate
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ABAS = ["📊 Visão Executiva", "📦 Análise de Mix", "📋 Detalhes Operacionais"]
+TIMEOUT = 120
+STREAM = '/_stcore/stream'
+
+
+class Sessao:
+    """Um usuário simulado: uma conexão websocket, a aba aberta e os widgets dele."""
+
+    def __init__(self, url, seed=0):
+        from websockets.sync.client import connect
+        self._conexao = ExitStack()
+        self.ws = self._conexao.enter_context(connect(
+            url.replace('http', 'ws', 1) + STREAM, origin=url, max_size=None, open_timeout=TIMEOUT))
+        self.rng = random.Random(seed)
+        self.aba = ABAS[0]
+        self.pagina = ''
+        # id -> WidgetState, reenviados a cada rerun como o navegador faz
+        self.widgets = {}
+        # Widgets vistos na última execução: rótulo -> (id, opções); (id, fragmento)
+        self.seletores = {}
+        self.slider = None
+        self.id_abas = None
+
+    def close(self):
+        self._conexao.close()
+
+    def _widget(self, id_, valor):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        estado = WidgetState(id=id_)
+        if isinstance(valor, str):
+            estado.string_value = valor
+        else:
+            estado.double_array_value.data.append(valor)
+        self.widgets[id_] = estado
+
+    def run(self, fragmento=''):
+        """Um rerun (do script ou de um fragmento); devolve a duração (s).
+
+        Levanta se o script terminou com exceção ou sem sucesso.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        if self.id_abas:
+            self._widget(self.id_abas, self.aba)
+        msg = BackMsg()
+        estado = msg.rerun_script
+        estado.query_string = ''
+        estado.page_script_hash = self.pagina
+        estado.fragment_id = fragmento
+        estado.widget_states.widgets.extend(self.widgets.values())
+        if not fragmento:
+            self.slider = None
+        excecoes = []
+
+        inicio = time.perf_counter()
+        self.ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(self.ws.recv(timeout=TIMEOUT))
+            tipo = fwd.WhichOneof('type')
+            if tipo == 'delta':
+                self._delta(fwd.delta, excecoes)
+            elif tipo == 'new_session':
+                self.pagina = fwd.new_session.page_script_hash
+            elif tipo == 'script_finished':
+                break
+        duracao = time.perf_counter() - inicio
+
+        if excecoes:
+            raise RuntimeError(excecoes[0])
+        if fwd.script_finished not in (ForwardMsg.FINISHED_SUCCESSFULLY,
+                                       ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY):
+            raise RuntimeError(f"script terminou com status {fwd.script_finished}")
+        return duracao
+
+    def _delta(self, delta, excecoes):
+        tipo = delta.WhichOneof('type')
+        if tipo == 'add_block' and delta.add_block.WhichOneof('type') == 'tab_container':
+            self.id_abas = delta.add_block.id
+        elif tipo == 'new_element':
+            elemento = delta.new_element
+            tipo = elemento.WhichOneof('type')
+            if tipo == 'selectbox':
+                self.seletores[elemento.selectbox.label] = (elemento.selectbox.id,
+                                                            list(elemento.selectbox.options))
+            elif tipo == 'slider':
+                self.slider = (elemento.slider.id, delta.fragment_id)
+            elif tipo == 'exception' and not elemento.exception.is_warning:
+                excecoes.append(f"{elemento.exception.type}: {elemento.exception.message}")
+
+    def acao(self):
+        """Sorteia e executa uma ação de usuário; devolve (nome, segundos)."""
+        opcoes = ['mes', 'loja', 'mix'] if self.aba == ABAS[0] else ['slider', 'executiva']
+        nome = self.rng.choice(opcoes)
+        if nome in ('mes', 'loja'):
+            seletor = self.seletores.get("Período (Mês)" if nome == 'mes' else "Unidade de Negócio")
+            if seletor is not None:
+                self._widget(seletor[0], self.rng.choice(seletor[1]))
+        elif nome == 'mix':
+            self.aba = ABAS[1]
+        elif nome == 'executiva':
+            self.aba = ABAS[0]
+        elif self.slider:
+            # O slider fica num fragmento: o navegador reroda só ele
+            id_, fragmento = self.slider
+            self._widget(id_, self.rng.randint(1, 4))
+            return nome, self.run(fragmento)
+        return nome, self.run()
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def servidor(pasta, porta=None, app=None):
+    """Sobe `python -m union.serve` sobre os CSVs de `pasta`; devolve (url, processo).
+
+    Com `app`, sobe `streamlit run app` no lugar do dashboard.
+    """
+    porta = porta or _porta_livre()
+    url = f"http://127.0.0.1:{porta}"
+    alvo = ['union.serve'] if app is None else ['streamlit', 'run', app]
+    cmd = [sys.executable, '-m', *alvo, '--server.port', str(porta),
+           '--server.address', '127.0.0.1', '--server.headless', 'true',
+           '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false']
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [RAIZ, os.environ.get('PYTHONPATH')]))}
+    with tempfile.TemporaryFile() as saida:
+        proc = subprocess.Popen(cmd, cwd=pasta, env=env, stdout=saida, stderr=subprocess.STDOUT)
+        try:
+            limite = time.monotonic() + TIMEOUT
+            while True:
+                if proc.poll() is not None:
+                    saida.seek(0)
+                    raise RuntimeError("o servidor não subiu:\n"
+                                       + saida.read().decode('utf-8', 'replace')[-2000:])
+                try:
+                    with urllib.request.urlopen(url + '/_stcore/health', timeout=1) as r:
+                        if r.status == 200:
+                            break
+                except OSError:
+                    if time.monotonic() > limite:
+                        raise
+                time.sleep(0.2)
+            yield url, proc
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+def nivel(url, n, acoes, seed=0, pid='self'):
+    """Roda `n` sessões em paralelo, `acoes` reruns cada; devolve as medições do nível.
+
+    `pid` é o processo do servidor, para a memória residente.
+    """
+    latencias, erros, lock = [], [], threading.Lock()
+    pronto = threading.Barrier(n)
+
+    def usuario(k):
+        sessao = None
+        try:
+            sessao = Sessao(url, seed=seed + k)
+            sessao.run()                       # primeira página, fora da conta
+            pronto.wait()
+            for _ in range(acoes):
+                acao = sessao.acao()
+                with lock:
+                    latencias.append(acao)
+        except Exception as e:
+            pronto.abort()
+            with lock:
+                erros.append(f"{type(e).__name__}: {e}")
+        finally:
+            if sessao is not None:
+                sessao.close()
+
+    threads = [threading.Thread(target=usuario, args=(k,), daemon=True) for k in range(n)]
+    inicio = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    total = time.perf_counter() - inicio
+
+    lat = np.array([s for _, s in latencias]) if latencias else np.array([np.nan])
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    por_acao = {}
+    for nome, segundos in latencias:
+        por_acao.setdefault(nome, []).append(segundos)
+    return {'sessoes': n, 'reruns': len(latencias), 'erros': erros[:5], 'n_erros': len(erros),
+            'p50': p50, 'p95': p95, 'p99': p99, 'max': float(lat.max()),
+            'reruns_s': len(latencias) / total, 'rss_mb': rss_mb(pid),
+            'p95_por_acao': {k: float(np.percentile(v, 95)) for k, v in sorted(por_acao.items())}}
+
+
+def run(pasta, niveis, acoes=20, seed=0):
+    """Medições de cada nível de concorrência sobre os CSVs de `pasta`."""
+    with servidor(pasta) as (url, proc):
+        # Carga dos dados antes do primeiro nível: ela não entra na latência dos reruns
+        sessao = Sessao(url)
+        try:
+            sessao.run()
+        finally:
+            sessao.close()
+        return [nivel(url, n, acoes, seed, proc.pid) for n in niveis]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pasta', help="CSVs já existentes (senão gera dados sintéticos)")
+    parser.add_argument('--lojas', type=int, default=100)
+    parser.add_argument('--meses', type=int, default=12)
+    parser.add_argument('--skus', type=int, default=20000)
+    parser.add_argument('--sessoes', default='1,2,4,8,16', help="níveis de concorrência, separados por vírgula")
+    parser.add_argument('--acoes', type=int, default=20, help="reruns por sessão em cada nível")
+    parser.add_argument('--limite', type=float, default=2.0, help="p95 aceitável (s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+    niveis = [int(n) for n in args.sessoes.split(',') if n.strip()]
+
+    with tempfile.TemporaryDirectory(prefix='union-loadtest-') as tmp:
+        pasta = os.path.abspath(args.pasta) if args.pasta else tmp
+        if not args.pasta:
+            print(f"gerando {args.lojas} lojas × {args.meses} meses, ~{args.skus:,} SKUs...", file=sys.stderr)
+            generate(pasta, args.lojas, args.meses, args.skus)
+        # O cache do teste não se mistura com o do app
+        os.environ['UNION_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        json_path = os.path.abspath(args.json) if args.json else None
+        resultados = run(pasta, niveis, args.acoes, args.seed)
+
+    print(f"{'sessões':>7}  {'reruns':>6}  {'p50 (s)':>8}  {'p95 (s)':>8}  {'p99 (s)':>8}  "
+          f"{'reruns/s':>8}  {'RSS (MB)':>8}  erros")
+    for r in resultados:
+        print(f"{r['sessoes']:>7}  {r['reruns']:>6}  {r['p50']:>8.3f}  {r['p95']:>8.3f}  {r['p99']:>8.3f}  "
+              f"{r['reruns_s']:>8.2f}  {r['rss_mb'] or 0:>8.0f}  {r['n_erros']}")
+        print("         p95 por ação: " + ", ".join(f"{k} {v:.3f}" for k, v in r['p95_por_acao'].items()))
+        for e in r['erros']:
+            print(f"         {e}")
+    ok = [r['sessoes'] for r in resultados if r['p95'] <= args.limite and not r['n_erros']]
+    print(f"maior nível com p95 <= {args.limite:g} s: {max(ok) if ok else 'nenhum'}")
+    # O servidor já terminou: o maior filho é ele
+    pico = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"pico de RSS do servidor: {pico:,.0f} MB")
+
+    if json_path:
+        saida = {'escala': {'pasta': args.pasta, 'lojas': args.lojas, 'meses': args.meses,
+                            'skus': args.skus},
+                 'acoes': args.acoes, 'limite': args.limite, 'pico_rss_mb': pico, 'niveis': resultados}
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(saida, f, ensure_ascii=False, indent=2, default=float)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""Conversão de números no formato brasileiro ("R$ 1.234,56", "13.514", "26,10%").
+
+As funções `clean_*_br` são a referência célula a célula. As funções
+`parse_*_br` aplicam exatamente as mesmas regras a uma coluna inteira de uma
+vez e devolvem também quantas células não vazias não puderam ser convertidas
+(essas continuam virando 0, como antes, mas deixam de ser silenciosas).
+"""
+import numpy as np
+import pandas as pd
+
+# Números que o float() do Python aceita e que o astype('float64') converte
+# com o mesmo arredondamento. O resto cai no caminho célula a célula.
+_NUMERO_SIMPLES = r'[+-]?(?:\d+\.?\d*|\.\d+)'
+
+
+# --- REFERÊNCIA CÉLULA A CÉLULA ---
+def clean_currency_br(x):
+    """Para valores monetários (float)"""
+    if pd.isna(x) or str(x).strip() == "": return 0.0
+    # Converte para string para garantir limpeza de pontos
+    s = str(x).strip().replace('"', '').replace("'", "").replace('R$', '').replace(' ', '')
+    s = s.replace('.', '').replace(',', '.')
+    try: return float(s)
+    except: return 0.0
+
+def clean_percentage_br(x):
+    """Para porcentagens"""
+    if pd.isna(x) or str(x).strip() == "": return 0.0
+    s = str(x).strip().replace('"', '').replace('%', '').replace(',', '.')
+    try: return float(s)
+    except: return 0.0
+
+def clean_int_br(x):
+    """
+    CORREÇÃO CRÍTICA: Força interpretação de ponto como milhar.
+    Ex: 13.514 -> vira 13514 (e não 13 ou 13.5)
+    """
+    if pd.isna(x) or str(x).strip() == "": return 0
+
+    # Converte tudo para string primeiro para evitar que o Pandas interprete 1.000 como 1.0
+    s = str(x).strip()
+
+    # Remove aspas e espaços
+    s = s.replace('"', '').replace("'", "").replace(' ', '')
+
+    # Se tiver vírgula (ex: 1.234,00), remove o decimal primeiro
+    if ',' in s:
+        s = s.split(',')[0]
+
+    # Agora remove o ponto de milhar
+    s = s.replace('.', '')
+
+    try:
+        # Converte para float primeiro (pra garantir) depois para int
+        return int(float(s))
+    except:
+        return 0
+
+
+# --- VERSÃO VETORIZADA (COLUNA INTEIRA) ---
+def _as_text(values):
+    """Texto de cada célula como o str(x) da referência, mantendo os nulos."""
+    values = pd.Series(values)
+    na = values.isna()
+    if pd.api.types.is_string_dtype(values.dtype) and not values.dtype == object:
+        return values, na
+    return values.astype(str).astype(object).mask(na), na
+
+
+def _replace_all(s, *pairs):
+    for old, new in pairs:
+        s = s.str.replace(old, new, regex=False)
+    return s
+
+
+def _float_or_none(s):
+    try: return float(s)
+    except: return None
+
+
+def _to_float(s, pending):
+    """Converte `s` onde `pending` é True; devolve (valores, máscara de falha)."""
+    out = np.zeros(len(s), dtype='float64')
+    pending = pending.to_numpy(dtype=bool)
+    if not pending.any():
+        return out, pending
+
+    # Caminho rápido: números "simples" convertidos em bloco
+    simple = s.str.fullmatch(_NUMERO_SIMPLES).to_numpy(dtype=bool, na_value=False) & pending
+    if simple.any():
+        out[simple] = s[simple].astype('float64').to_numpy()
+
+    # Caminho lento só para o que sobrou (notação científica, 'inf', lixo...)
+    # ('nan' é aceito pelo float() e continua virando NaN, como na referência)
+    failed = np.zeros(len(s), dtype=bool)
+    rest = np.flatnonzero(pending & ~simple)
+    for i, v in zip(rest, s.iloc[rest]):
+        f = _float_or_none(v)
+        if f is None: failed[i] = True
+        else: out[i] = f
+    return out, failed
+
+
+def parse_currency_br(values):
+    """Coluna monetária -> (Series float64, nº de células que falharam)."""
+    txt, na = _as_text(values)
+    s = txt.str.strip()
+    blank = na | (s == "")
+    s = _replace_all(s, ('"', ''), ("'", ''), ('R$', ''), (' ', ''), ('.', ''), (',', '.'))
+    out, failed = _to_float(s, ~blank)
+    return pd.Series(out, index=txt.index, name=txt.name), int(failed.sum())
+
+
+def parse_percentage_br(values):
+    """Coluna de porcentagem -> (Series float64, nº de células que falharam)."""
+    txt, na = _as_text(values)
+    s = txt.str.strip()
+    blank = na | (s == "")
+    s = _replace_all(s, ('"', ''), ('%', ''), (',', '.'))
+    out, failed = _to_float(s, ~blank)
+    return pd.Series(out, index=txt.index, name=txt.name), int(failed.sum())
+
+
+def parse_percentage_thousands_br(values):
+    """Porcentagem com ponto de milhar (ex: -2.924,13) -> (Series float64, nº de falhas)."""
+    txt, na = _as_text(values)
+    s = txt.str.strip()
+    blank = na | (s == "")
+    s = _replace_all(s, ('"', ''), ('%', ''), (' ', ''), ('.', ''), (',', '.'))
+    out, failed = _to_float(s, ~blank)
+    return pd.Series(out, index=txt.index, name=txt.name), int(failed.sum())
+
+
+def parse_int_br(values):
+    """Coluna inteira (ponto = milhar) -> (Series int64, nº de células que falharam)."""
+    txt, na = _as_text(values)
+    s = txt.str.strip()
+    blank = na | (s == "")
+    s = _replace_all(s, ('"', ''), ("'", ''), (' ', ''))
+    # Se tiver vírgula (ex: 1.234,00), descarta o decimal antes de tirar o milhar
+    comma = s.str.contains(',', regex=False).to_numpy(dtype=bool, na_value=False)
+    if comma.any():
+        s = s.copy()
+        s[comma] = s[comma].str.split(',', n=1).str[0]
+    s = _replace_all(s, ('.', ''))
+    out, failed = _to_float(s, ~blank)
+    # int(float('inf')) e int(float('nan')) também falham na referência; acima
+    # do int64 a referência devolveria um int do Python, aqui conta como falha
+    bad = ~np.isfinite(out) | (np.abs(out) >= 2.0 ** 63)
+    out[bad] = 0.0
+    failed = failed | bad
+    return pd.Series(np.trunc(out).astype('int64'), index=txt.index, name=txt.name), int(failed.sum())
+
+
+BR_PARSERS = {
+    'moeda': parse_currency_br,
+    'percentual': parse_percentage_br,
+    'percentual_milhar': parse_percentage_thousands_br,
+    'inteiro': parse_int_br,
+}
+
+
+def clean_columns(df, spec):
+    """Converte in-place as colunas de `spec` ({coluna: tipo}) presentes em `df`.
+
+    Devolve {coluna: nº de células que falharam}, só com as colunas que tiveram falha.
+    """
+    falhas = {}
+    for col, tipo in spec.items():
+        if col not in df.columns: continue
+        df[col], n = BR_PARSERS[tipo](df[col])
+        if n: falhas[col] = n
+    return falhas
@@ -0,0 +1,132 @@
+"""Consultas das abas (filtros Mês/Loja, KPIs, agregações por dimensão).
+
+As abas não sabem de onde vêm os números: pedem `totals`/`rollup` a um
+backend. `PandasBackend` responde a partir do cubo Mês × Loja em memória;
+`DuckDBBackend` (opcional, `pip install duckdb`) roda SQL num motor colunar
+embutido, sem servidor nem rede, sobre os arquivos Arrow do cache em disco
+mapeados em memória (ou, sem cache, sobre uma cópia Arrow da base). Ele
+acelera filtros e agregações em bases grandes, mas não dispensa a RAM: a base
+em pandas e o cubo continuam sendo montados, porque as outras abas, as opções
+dos filtros e o export usam os dois.
+
+UNION_QUERY_BACKEND escolhe: 'pandas', 'duckdb' ou 'auto' (padrão: DuckDB
+quando instalado e a base tem pelo menos UNION_DUCKDB_MIN_ROWS linhas).
+"""
+import importlib.util
+import logging
+import os
+import threading
+
+import numpy as np
+import pyarrow as pa
+
+from union.cube import DIMENSOES, rollup, slice_cube, totals
+
+log = logging.getLogger(__name__)
+
+QUERY_BACKEND = os.environ.get('UNION_QUERY_BACKEND', 'auto')
+DUCKDB_MIN_ROWS = int(os.environ.get('UNION_DUCKDB_MIN_ROWS', 5_000_000))
+
+
+class PandasBackend:
+    """Consultas sobre o cubo de `build_cube` (ver union/cube.py)."""
+
+    nome = 'pandas'
+
+    def __init__(self, cubo, indice=None):
+        self.cubo, self.indice = cubo, indice
+        self.dims = tuple(d for d in DIMENSOES if d in cubo.index.names)
+
+    def totals(self, mes='Todos', loja='Todas'):
+        return totals(slice_cube(self.cubo, mes, loja, self.indice))
+
+    def rollup(self, dim, medidas, mes='Todos', loja='Todas'):
+        return rollup(slice_cube(self.cubo, mes, loja, self.indice), dim, medidas)
+
+
+class DuckDBBackend:
+    """As mesmas consultas em SQL sobre uma tabela Arrow com as colunas da base."""
+
+    nome = 'duckdb'
+
+    def __init__(self, tabela):
+        import duckdb
+        self.colunas = set(tabela.column_names)
+        self.dims = tuple(d for d in DIMENSOES if d in self.colunas)
+        self._con = duckdb.connect()
+        self._con.register('base', tabela)
+        # Uma conexão DuckDB não pode ser usada por duas threads ao mesmo tempo
+        self._lock = threading.Lock()
+
+    def _where(self, mes, loja):
+        filtros = {}
+        if mes != 'Todos': filtros['Mes'] = mes
+        if loja != 'Todas': filtros['Loja'] = loja
+        cond = [f'"{d}" = ?' for d in filtros if d in self.colunas]
+        params = [v for d, v in filtros.items() if d in self.colunas]
+        return cond, params
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._con.execute(sql, params).df()
+
+    def totals(self, mes='Todos', loja='Todas'):
+        cond, params = self._where(mes, loja)
+        soma = lambda c: f'coalesce(sum("{c}"), 0)' if c in self.colunas else '0'
+        margem = 'count("Margem_Perc"), sum("Margem_Perc")' if 'Margem_Perc' in self.colunas else '0, 0'
+        where = f"WHERE {' AND '.join(cond)}" if cond else ''
+        sql = (f'SELECT {soma("Venda")}, {soma("Meta")}, CAST({soma("Clientes")} AS BIGINT), {margem} '
+               f'FROM base {where}')
+        venda, meta, clientes, n, margem_soma = self._query(sql, params).iloc[0]
+        if 'Margem_Perc' not in self.colunas:
+            margem = 0
+        else:
+            margem = margem_soma / n if n else np.nan
+        return {'venda': venda, 'meta': meta, 'clientes': clientes, 'margem': margem}
+
+    def rollup(self, dim, medidas, mes='Todos', loja='Todas'):
+        cond, params = self._where(mes, loja)
+        # Como no groupby do pandas: linhas sem valor na dimensão ficam de fora
+        cond.append(f'"{dim}" IS NOT NULL')
+        somas = ', '.join(
+            f'CAST(sum("{m}") AS BIGINT) AS "{m}"' if m == 'Clientes' else f'sum("{m}") AS "{m}"'
+            for m in medidas)
+        sql = (f'SELECT CAST("{dim}" AS VARCHAR) AS "{dim}", {somas} FROM base '
+               f'WHERE {" AND ".join(cond)} GROUP BY 1 ORDER BY 1')
+        return self._query(sql, params)
+
+
+def arrow_table(base, arquivos=None):
+    """Tabela Arrow da base: os arquivos do cache, mapeados em memória, quando
+    batem com `base`; senão uma conversão do próprio DataFrame."""
+    if arquivos:
+        try:
+            tabelas = [pa.ipc.open_file(pa.memory_map(p)).read_all() for p in arquivos]
+            tabela = pa.concat_tables(tabelas, promote_options='default')
+            if tabela.num_rows == len(base):
+                return tabela
+        except (OSError, pa.ArrowException):
+            pass
+    return pa.Table.from_pandas(base, preserve_index=False)
+
+
+def make_backend(datasets, kind=None):
+    """Backend de consultas para os datasets de `load_datasets`.
+
+    Sem `kind`, vale UNION_QUERY_BACKEND. `kind` desconhecido, ou 'duckdb' sem o pacote instalado, cai no pandas
+    com um aviso no log: configuração errada não derruba o dashboard.
+    """
+    kind = kind or QUERY_BACKEND
+    tem_duckdb = importlib.util.find_spec('duckdb') is not None
+    if kind == 'auto':
+        grande = len(datasets['base']) >= DUCKDB_MIN_ROWS
+        kind = 'duckdb' if grande and tem_duckdb else 'pandas'
+    elif kind == 'duckdb' and not tem_duckdb:
+        log.warning("UNION_QUERY_BACKEND=duckdb, mas o duckdb não está instalado: usando pandas")
+        kind = 'pandas'
+    elif kind not in ('duckdb', 'pandas'):
+        log.warning("UNION_QUERY_BACKEND desconhecido (%r): usando pandas", kind)
+        kind = 'pandas'
+    if kind == 'duckdb':
+        return DuckDBBackend(arrow_table(datasets['base'], datasets.get('base_arquivos')))
+    return PandasBackend(datasets['cubo'], datasets.get('cubo_idx'))
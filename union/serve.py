@@ -0,0 +1,27 @@
+"""Sobe o dashboard já carregando os datasets em segundo plano.
+
+    python -m union.serve [opções do `streamlit run`]
+
+O `streamlit run app.py` só executa o app na primeira sessão, que pagaria a
+carga inteira. Aqui o `DatasetStore` começa a ler antes do servidor abrir a
+porta, no mesmo processo; quando o primeiro usuário chega, os dados já estão
+(ou estão quase) prontos.
+"""
+import os
+import sys
+
+from streamlit.web import cli
+
+from union.shared import get_store
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def main():
+    get_store('.')
+    sys.argv = ['streamlit', 'run', APP, *sys.argv[1:]]
+    sys.exit(cli.main())
+
+
+if __name__ == '__main__':
+    main()
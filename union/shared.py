@@ -0,0 +1,162 @@
+"""Datasets compartilhados por todas as sessões do servidor, só para leitura.
+
+Um `DatasetStore` por processo carrega os datasets numa thread, assim que o
+servidor sobe (ver union/serve.py), e os recarrega quando os CSVs mudam. Os
+buffers dos dados são um só para todas as sessões: `freeze` os trava contra
+escrita e cada execução do script recebe `session_view`, com cópias rasas dos
+DataFrames (novos objetos sobre os mesmos buffers). Atribuir, apagar ou
+renomear colunas numa sessão só muda a cópia dela; escrever valores nela
+dispara o Copy-on-Write do pandas, que copia só o bloco tocado.
+"""
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from union.ingest import BASE_DIR, load_datasets, source_signature
+from union.instrument import stage, tracing
+
+log = logging.getLogger(__name__)
+
+# Intervalo (s) entre verificações de mudança nos CSVs
+WATCH_SECONDS = float(os.environ.get('UNION_WATCH_SECONDS', 5))
+
+
+def freeze(obj):
+    """Versão só leitura de `obj` (dict de datasets, DataFrame, array...).
+
+    - DataFrame/Series: os buffers numpy (inclusive os códigos das colunas
+      `category`) ficam read-only; `df.loc[...] = x` levanta ValueError.
+      Só os valores são protegidos: `df['c'] = x`, `del df['c']` e os métodos
+      com `inplace=True` mudam o próprio objeto. Por isso as sessões nunca
+      recebem o DataFrame congelado, e sim `session_view`.
+    - ndarray: read-only.
+    - dict: MappingProxyType (recursivo); list vira tuple.
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        for block in obj._mgr.blocks:
+            _lock(block.values)
+        return obj
+    if isinstance(obj, np.ndarray):
+        return _lock(obj)
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def session_view(obj):
+    """Datasets de uma sessão: cópias rasas dos DataFrames/Series de `obj`.
+
+    `copy(deep=False)` cria só o objeto (colunas, índice), sem copiar os
+    buffers; com o Copy-on-Write, o que a sessão fizer na cópia não chega ao
+    original. Dicts e tuplas de `freeze` são percorridos; o resto volta igual.
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return obj.copy(deep=False)
+    if isinstance(obj, MappingProxyType):
+        return MappingProxyType({k: session_view(v) for k, v in obj.items()})
+    if isinstance(obj, tuple):
+        return tuple(session_view(v) for v in obj)
+    return obj
+
+
+def _lock(values):
+    # Categorical e afins guardam um ndarray interno (`_ndarray`)
+    arr = getattr(values, '_ndarray', values)
+    if isinstance(arr, np.ndarray):
+        arr.setflags(write=False)
+    return values
+
+
+class DatasetStore:
+    """Datasets carregados e recarregados em segundo plano, com troca atômica.
+
+    `load(progresso)` devolve os datasets; `signature()` muda quando as
+    fontes mudam. Uma thread carrega logo no `start` e depois confere a
+    assinatura a cada `interval` segundos, reconstruindo fora do caminho das
+    sessões. `current` é None até a primeira carga e depois sempre uma tupla
+    completa (assinatura, datasets congelados): a troca é uma única atribuição,
+    então uma sessão vê a versão antiga ou a nova, nunca uma pela metade.
+    `view()` é o que as sessões usam: a versão atual com `session_view`.
+    """
+
+    def __init__(self, load, signature, interval=WATCH_SECONDS):
+        self._load = load
+        self._signature = signature
+        self.interval = interval
+        self.current = None
+        # (bytes lidos, total) da carga em andamento
+        self.progresso = (0, 0)
+        # Etapas da última carga (ver union/instrument.py)
+        self.trace = None
+        self._pronto = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='union-datasets', daemon=True)
+                self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """`current`, esperando até `timeout` segundos pela primeira carga."""
+        self._pronto.wait(timeout)
+        return self.current
+
+    def view(self):
+        """(assinatura, datasets da sessão) da versão atual; None antes da carga."""
+        atual = self.current
+        return None if atual is None else (atual[0], session_view(atual[1]))
+
+    def refresh(self):
+        """Recarrega se a assinatura mudou; True quando trocou de versão."""
+        assinatura = self._signature()
+        if self.current is not None and self.current[0] == assinatura:
+            return False
+        with tracing('carga') as trace:
+            datasets = self._load(progresso=self._set_progresso)
+            with stage('congelar'):
+                datasets = freeze(datasets)
+        self.current = (assinatura, datasets)
+        self.trace = trace
+        self._pronto.set()
+        log.info("datasets carregados em %.2f s", trace.segundos)
+        return True
+
+    def _set_progresso(self, lidos, total):
+        self.progresso = (lidos, total)
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                log.exception("falha ao carregar os datasets")
+                # Sem versão anterior, as sessões mostram o erro em vez de esperar
+                if self.current is None:
+                    self.current = (None, freeze({'falhas': {}, 'erros': {'base': str(e)}}))
+                    self._pronto.set()
+            time.sleep(self.interval)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(pasta='.', base_dir=BASE_DIR):
+    """O `DatasetStore` (já iniciado) de `pasta`, um por processo."""
+    key = (os.path.abspath(pasta), base_dir)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = DatasetStore(
+                lambda progresso: load_datasets(pasta, progresso=progresso, base_dir=base_dir),
+                lambda: source_signature(pasta, base_dir)).start()
+        return _stores[key]
@@ -0,0 +1,125 @@
+"""Detecção de encoding, separador, linha de cabeçalho e colunas de um CSV.
+
+Lê só os primeiros SNIFF_BYTES do arquivo, uma vez; o arquivo inteiro é
+depois lido uma única vez com essas configurações. O resultado fica em
+`.union_cache/sniff/`, chaveado pelo caminho e pelos bytes iniciais: um
+arquivo que só cresceu no fim não precisa ser farejado de novo.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+from collections import Counter
+
+import pandas as pd
+
+from union.cache import _atomic_write, _dump_json, cache_dir
+
+log = logging.getLogger(__name__)
+
+SNIFF_BYTES = 64 * 1024
+DELIMITADORES = [',', ';', '\t', '|']
+# Linhas do início do arquivo em que o cabeçalho é procurado
+MAX_HEADER_ROW = 20
+
+
+def match_columns(columns, mapping):
+    """{coluna do arquivo: nome padrão} para cada chave de `mapping` achada no cabeçalho."""
+    cols_found = {}
+    for k, v in mapping.items():
+        match = next((c for c in columns if k.lower() in c.lower()), None)
+        if match: cols_found[match] = v
+    return cols_found
+
+
+def _decode(sample):
+    try:
+        return sample.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError as e:
+        # Caractere multibyte cortado no fim da amostra não conta como erro
+        if len(sample) == SNIFF_BYTES and e.start >= len(sample) - 3:
+            try:
+                return sample[:e.start].decode('utf-8'), 'utf-8'
+            except UnicodeDecodeError:
+                pass
+        return sample.decode('latin1'), 'latin1'
+
+
+def _detect_sep(text):
+    """Separador que dá o maior bloco de linhas com o mesmo número de campos."""
+    best, score = ',', 0
+    for sep in DELIMITADORES:
+        widths = Counter(len(r) for r in csv.reader(io.StringIO(text), delimiter=sep) if r)
+        if not widths: continue
+        width, freq = widths.most_common(1)[0]
+        if width > 1 and freq * width > score:
+            best, score = sep, freq * width
+    return best
+
+
+def _detect_header(text, sep, mapping):
+    """Índice (sem contar linhas em branco, como o pandas) da linha que mais casa com `mapping`."""
+    best, score = 0, 0
+    rows = (r for r in csv.reader(io.StringIO(text), delimiter=sep) if r)
+    for i, row in enumerate(rows):
+        if i >= MAX_HEADER_ROW: break
+        fields = [f.strip().lower() for f in row]
+        hits = sum(any(k.lower() in f for f in fields) for k in mapping)
+        if hits > score:
+            best, score = i, hits
+    return best
+
+
+def sniff_csv(sample, mapping):
+    """Configuração de leitura a partir dos bytes iniciais `sample` de um CSV.
+
+    {'encoding', 'sep', 'header', 'columns', 'mapping'}: `columns` são os nomes
+    (sem espaços nas pontas) como o pandas os leria e `mapping` o resultado de
+    `match_columns` sobre eles.
+    """
+    text, encoding = _decode(sample)
+    if len(sample) == SNIFF_BYTES and '\n' in text:
+        text = text[:text.rfind('\n') + 1]    # só linhas completas
+    sep = _detect_sep(text)
+    header = _detect_header(text, sep, mapping)
+    try:
+        columns = pd.read_csv(io.StringIO(text), sep=sep, header=header, nrows=0).columns
+        columns = [str(c).strip() for c in columns]
+    except (ValueError, pd.errors.ParserError):
+        columns = []
+    return {'encoding': encoding, 'sep': sep, 'header': header, 'columns': columns,
+            'mapping': match_columns(columns, mapping)}
+
+
+def cached_sniff(path, mapping, pasta='.'):
+    """`sniff_csv` do início de `path`, reaproveitando o resultado já gravado.
+
+    A configuração devolvida traz em '_cache' onde foi gravada (ver `remember`).
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES)
+    h = hashlib.blake2b(digest_size=12)
+    h.update(os.path.abspath(path).encode())
+    h.update(json.dumps(mapping, sort_keys=True).encode())
+    h.update(sample)
+    cache_file = os.path.join(cache_dir(pasta), 'sniff', f"{h.hexdigest()}.json")
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            conf = json.load(f)
+    except (OSError, ValueError):
+        conf = sniff_csv(sample, mapping)
+        remember(cache_file, conf)
+    conf['_cache'] = cache_file
+    return conf
+
+
+def remember(cache_file, conf):
+    """Grava (ou corrige, ex.: o encoding) a configuração farejada."""
+    conf = {k: v for k, v in conf.items() if not k.startswith('_')}
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        _atomic_write(cache_file, lambda tmp: _dump_json(tmp, conf))
+    except OSError as e:
+        log.warning("não foi possível gravar %s: %s", cache_file, e)
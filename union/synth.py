@@ -0,0 +1,206 @@
+"""Gerador de dados sintéticos no formato dos CSVs do cliente.
+
+Escreve `dados.csv` (uma linha por loja × mês) e `classificacao_mercadologica.csv`
+(árvore de 5 níveis até o SKU) com o mesmo cabeçalho bagunçado, números no
+formato BR entre aspas ("  1.234,56 "), "%" nos percentuais e algumas células
+sujas, em utf-8 ou latin1, na escala pedida:
+
+    python -m union.synth /tmp/carga --lojas 1000 --meses 60 --skus 200000
+
+Serve para medir o pipeline (ver union/bench.py) sem depender dos dados reais.
+"""
+import argparse
+import csv
+import os
+
+import numpy as np
+
+from union.filters import ORDEM_MESES
+
+# Cabeçalho de dados.csv, com os espaços e quebras de linha do export original
+BASE_HEADER = [
+    'MÊS', 'Mês2', 'CLIENTE', 'REGIÃO', 'UF', 'COD LOJA', 'NOME LOJA', 'VISÃO',
+    ' Venda 2021 R$', ' Venda 2022 R$', ' Meta Venda 2022', ' CMV 2021 R$', ' CMV 2022 R$',
+    ' Margem Bruta 2021 R$', ' Margem Bruta 2022 R$', ' Meta Margem Bruta R$ 2022',
+    ' Verbas e Contratos 2021 R$', ' Verbas e Contratos 2022 R$',
+    ' Perdas e Quebras 2021 R$', ' Perdas e Quebras 2022 R$',
+    ' Estoques 2021 (R$) \r\nLoja', ' Estoques 2022 (R$) \r\nLoja',
+    ' Qtd de cupom 2021', 'Qtd de cupom 2022', ' Venda Oferta 2021 R$', ' Venda Oferta 2022 R$',
+    'Ruptura Zerados 2021 %', ' Ruptura Zerados 2022 %',
+    ' Despesas de Pessoal Total R$ 2021', ' Despesas de Pessoal Total R$ 2022',
+    ' Despesas Gerais Total R$ 2021', ' Despesas Gerais Total R$ 2022',
+    'Margem Bruta 2022 %', ' Margem Bruta 2021 %', 'Meta Margem Bruta %  2022', ' Formato',
+]
+MIX_HEADER = ['Código', 'Classificação', 'Grupo', 'Valor', '% Partic', '% Lucro', '%% Vendas',
+              'Núm. Clientes']
+
+REGIOES = [('IMBITUVA', 'PR'), ('GUAMIRANGA', 'PR'), ('PONTA GROSSA', 'PR'), ('IRATI', 'PR'),
+           ('UNIÃO DA VITÓRIA', 'PR'), ('JOINVILLE', 'SC'), ('CHAPECÓ', 'SC'), ('SÃO PAULO', 'SP')]
+DEPARTAMENTOS = ['Mercearia', 'Perecíveis', 'Bebidas', 'Limpeza', 'Higiene e Beleza',
+                 'Padaria', 'Açougue', 'Hortifrúti', 'Bazar']
+# Recuo do 'Grupo' por nível, como no relatório do ERP
+RECUO = {1: '', 2: ' ' * 4, 3: ' ' * 10, 4: ' ' * 16, 5: ' ' * 22}
+# Valores "sujos" que aparecem no lugar de números no export
+SUJEIRA = ['-', '#N/D', 'n/a', '1.234.56,7']
+_BR = str.maketrans(',.', '.,')
+
+
+def moeda_br(valores):
+    return [f"  {v:,.2f} ".translate(_BR) for v in valores]
+
+
+def inteiro_br(valores):
+    return [f"  {v:,d} ".translate(_BR) for v in valores]
+
+
+def percentual_br(valores, sinal='%'):
+    return [f"{v:.2f}{sinal}".replace('.', ',') for v in valores]
+
+
+def gerar_base(lojas=4, meses=12, sujeira=0.001, seed=0):
+    """Linhas de dados.csv (listas de str, sem o cabeçalho), loja a loja, mês a mês."""
+    rng = np.random.default_rng(seed)
+    n = lojas * meses
+    loja = np.repeat(np.arange(lojas), meses)
+    mes = np.tile(np.arange(meses), lojas)
+
+    porte = rng.lognormal(14.4, 0.5, lojas)[loja]          # venda típica da loja (~R$ 2 mi)
+    sazonal = 1 + 0.15 * np.sin(2 * np.pi * (mes % 12) / 12)
+    venda21 = porte * sazonal * rng.normal(1, 0.05, n)
+    venda22 = venda21 * rng.normal(1.12, 0.05, n)
+    meta = venda22 * rng.normal(1.0, 0.06, n)
+    cmv21, cmv22 = venda21 * rng.normal(0.75, 0.02, n), venda22 * rng.normal(0.74, 0.02, n)
+    mb21, mb22 = venda21 - cmv21, venda22 - cmv22
+    cupom21 = (venda21 / rng.normal(60, 5, n)).astype(np.int64)
+    cupom22 = (venda22 / rng.normal(62, 5, n)).astype(np.int64)
+    frac = lambda base, media: base * rng.normal(media, media / 5, n)
+
+    numeros = [
+        moeda_br(venda21), moeda_br(venda22), moeda_br(meta), moeda_br(cmv21), moeda_br(cmv22),
+        moeda_br(mb21), moeda_br(mb22), moeda_br(meta * 0.26),
+        moeda_br(frac(venda21, 0.005)), moeda_br(frac(venda22, 0.005)),
+        moeda_br(frac(venda21, 0.025)), moeda_br(frac(venda22, 0.025)),
+        moeda_br(frac(venda21, 0.8)), moeda_br(frac(venda22, 0.8)),
+        inteiro_br(cupom21), inteiro_br(cupom22),
+        moeda_br(frac(venda21, 0.15)), moeda_br(frac(venda22, 0.15)),
+        [''] * n, [''] * n,                                    # Ruptura: vazia no export
+        moeda_br(frac(venda21, 0.1)), moeda_br(frac(venda22, 0.1)),
+        moeda_br(frac(venda21, 0.17)), moeda_br(frac(venda22, 0.17)),
+        percentual_br(mb22 / venda22 * 100), percentual_br(mb21 / venda21 * 100),
+        percentual_br(rng.normal(26.5, 0.5, n)),
+    ]
+    if sujeira:
+        for col in numeros:
+            for i in np.flatnonzero(rng.random(n) < sujeira):
+                col[i] = SUJEIRA[i % len(SUJEIRA)]
+
+    regiao = rng.integers(0, len(REGIOES), lojas)
+    formato = np.where(rng.random(lojas) < 0.8, ' VAREJO', ' ATACAREJO')
+    visao = np.where(rng.random(lojas) < 0.9, 'MESMA LOJA', 'LOJA NOVA')
+    linhas = []
+    for i in range(n):
+        l, m = loja[i], ORDEM_MESES[mes[i] % 12]
+        cidade, uf = REGIOES[regiao[l]]
+        linhas.append([m, m.lower() + '.', 'LARISSA', cidade, uf, f"{l + 1:03d}", f"LOJA {l + 1:04d}",
+                       visao[l], *(col[i] for col in numeros), formato[l]])
+    return linhas
+
+
+def gerar_mix(skus=3000, seed=0):
+    """Linhas da classificação mercadológica em pré-ordem, com somas coerentes por nível."""
+    rng = np.random.default_rng(seed)
+    # Filhos por nó em cada nível para chegar perto de `skus` folhas (nível 5)
+    abertura = max(1, round((skus / len(DEPARTAMENTOS)) ** 0.25))
+    linhas = []
+
+    def no(codigo, nivel, nome):
+        pos = len(linhas)
+        linhas.append(None)
+        if nivel == 5:
+            # Em centavos inteiros: a soma dos filhos bate exatamente com o pai
+            valor, clientes = int(rng.lognormal(8, 1.5) * 100), int(rng.integers(0, 3000))
+        else:
+            filhos = int(rng.integers(abertura - abertura // 2, abertura + abertura // 2 + 1))
+            sufixo = '{:02d}' if nivel == 1 else '{:03d}'
+            inicio = 10 if nivel == 1 else 1
+            valor = sum(no(f"{codigo}.{sufixo.format(inicio + k)}", nivel + 1, None) for k in range(filhos))
+            clientes = 0
+        linhas[pos] = [codigo, nivel, nome or f"Grupo {codigo}", valor, float(rng.normal(22, 4)), clientes]
+        return valor
+
+    for d, nome in enumerate(DEPARTAMENTOS, start=1):
+        no(str(d), 1, nome)
+
+    total = sum(l[3] for l in linhas if l[1] == 1)
+    pai_valor, saida = {}, []
+    for k, (codigo, nivel, nome, valor, lucro, clientes) in enumerate(linhas):
+        pai_valor[nivel] = valor
+        part = 100.0 if nivel == 1 else valor / pai_valor[nivel - 1] * 100
+        saida.append([str(10000 + k), codigo, RECUO[nivel] + nome, moeda_br([valor / 100])[0].strip(),
+                      *percentual_br([part, lucro, valor / total * 100], sinal=''), str(clientes)])
+    return saida
+
+
+def write_base(path, linhas, encoding='utf-8'):
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        w = csv.writer(f, lineterminator='\r\n')
+        w.writerow(BASE_HEADER)
+        w.writerows(linhas)
+
+
+def write_mix(path, linhas, encoding='utf-8'):
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        w = csv.writer(f, lineterminator='\r\n')
+        # Linha em branco antes do cabeçalho e "Atendidos" quebrado na linha seguinte
+        w.writerow([''] * len(MIX_HEADER))
+        w.writerow(MIX_HEADER)
+        w.writerow([''] * (len(MIX_HEADER) - 1) + ['Atendidos'])
+        w.writerows(linhas)
+        w.writerow([''] * len(MIX_HEADER))
+
+
+def generate(pasta, lojas=4, meses=12, skus=3000, encoding='utf-8', sujeira=0.001, seed=0,
+             por_arquivo=False):
+    """Escreve os dois CSVs em `pasta`; devolve {nome: caminho}.
+
+    Com `por_arquivo`, a base vira um CSV por loja em `pasta/base/`
+    (para o modo multiarquivo, UNION_BASE_DIR).
+    """
+    os.makedirs(pasta, exist_ok=True)
+    linhas = gerar_base(lojas, meses, sujeira, seed)
+    arquivos = {}
+    if por_arquivo:
+        base_dir = os.path.join(pasta, 'base')
+        os.makedirs(base_dir, exist_ok=True)
+        for l in range(lojas):
+            write_base(os.path.join(base_dir, f"loja_{l + 1:04d}.csv"),
+                       linhas[l * meses:(l + 1) * meses], encoding)
+        arquivos['base_dir'] = base_dir
+    else:
+        arquivos['base'] = os.path.join(pasta, 'dados.csv')
+        write_base(arquivos['base'], linhas, encoding)
+    arquivos['mix'] = os.path.join(pasta, 'classificacao_mercadologica.csv')
+    write_mix(arquivos['mix'], gerar_mix(skus, seed), encoding)
+    return arquivos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pasta')
+    parser.add_argument('--lojas', type=int, default=4)
+    parser.add_argument('--meses', type=int, default=12)
+    parser.add_argument('--skus', type=int, default=3000)
+    parser.add_argument('--encoding', choices=['utf-8', 'latin1'], default='utf-8')
+    parser.add_argument('--sujeira', type=float, default=0.001,
+                        help="fração das células numéricas com lixo ('-', '#N/D'...)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--por-arquivo', action='store_true', help="um CSV de base por loja")
+    args = parser.parse_args(argv)
+    arquivos = generate(args.pasta, args.lojas, args.meses, args.skus, args.encoding,
+                        args.sujeira, args.seed, args.por_arquivo)
+    for nome, caminho in arquivos.items():
+        print(f"{nome}: {caminho}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Ordenação, busca e paginação de tabelas no servidor.
+
+A tabela inteira fica no servidor; só as linhas da página visível vão para o
+navegador. As funções trabalham com vetores de posições (iloc): a ordenação é
+calculada uma vez e reaproveitada, e busca/página são operações sobre ela.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+TAMANHO_PAGINA = 50
+
+
+def sort_order(values, ascending=True):
+    """Posições de `values` em ordem (estável, nulos no fim)."""
+    s = pd.Series(np.asarray(values))
+    return s.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+
+def restrict(order, subset):
+    """Mantém em `order` só as posições de `subset` (slice ou vetor), sem reordenar."""
+    if subset is None:
+        return order
+    if isinstance(subset, slice):
+        return order[(order >= subset.start) & (order < subset.stop)]
+    return order[np.isin(order, subset)]
+
+
+def search_mask(df, cols, termo):
+    """Máscara das linhas em que algum de `cols` contém `termo` (sem diferenciar maiúsculas)."""
+    mask = np.zeros(len(df), dtype=bool)
+    for col in cols:
+        if col in df.columns:
+            hit = df[col].astype(str).str.contains(termo, case=False, regex=False)
+            mask |= hit.to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def page(order, pagina, tamanho=TAMANHO_PAGINA):
+    """(posições da `pagina` (1..n), total de páginas) de uma ordem já filtrada."""
+    n_paginas = max(1, math.ceil(len(order) / tamanho))
+    pagina = min(max(1, pagina), n_paginas)
+    return order[(pagina - 1) * tamanho: pagina * tamanho], n_paginas